@@ -104,7 +104,7 @@ else
     "${ENV_DIR}/bin/pip" install fastmcp==2.14.1 loguru==0.7.3 pandas==2.3.3 numpy==2.4.0 tqdm==4.67.1 click==8.3.1
 
     info "Installing MCP dependencies..."
-    "${ENV_DIR}/bin/pip" install --ignore-installed mcp pydantic uvicorn websockets rich
+    "${ENV_DIR}/bin/pip" install --ignore-installed mcp pydantic uvicorn websockets rich uvloop
     success "Dependencies installed"
 fi
 
@@ -0,0 +1,7 @@
+"""
+NetMHCpan MCP scripts.
+
+Each script runs standalone from the command line and can also be imported
+as part of this package, e.g. ``from scripts.peptide_prediction import
+run_peptide_prediction`` (as the MCP server does).
+"""
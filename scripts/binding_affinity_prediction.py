@@ -17,17 +17,39 @@ Example:
 # Minimal Imports (only essential packages)
 # ==============================================================================
 import argparse
-import json
+import heapq
+import importlib.util
+import mmap
+import operator
+import os
+import shutil
 import sys
+import tempfile
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
 from pathlib import Path
-from typing import Union, Optional, Dict, Any
+from typing import Union, Optional, Dict, Any, List, Iterable, Iterator
+
+# Local imports: a package import when loaded as part of the scripts package
+# (e.g. by the MCP server); run directly, the script's own directory is used
+try:
+    from .lib.utils import (
+        setup_logger, setup_netmhcpan_env, run_netmhcpan_streaming,
+        validate_input_file, load_config, normalize_allele_name,
+        STRONG_BINDER_RANK, WEAK_BINDER_RANK
+    )
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent))
+    from lib.utils import (
+        setup_logger, setup_netmhcpan_env, run_netmhcpan_streaming,
+        validate_input_file, load_config, normalize_allele_name,
+        STRONG_BINDER_RANK, WEAK_BINDER_RANK
+    )
 
-# Local imports
-sys.path.insert(0, str(Path(__file__).parent))
-from lib.utils import (
-    setup_logger, setup_netmhcpan_env, run_netmhcpan_command,
-    parse_netmhcpan_results, validate_input_file, get_mcp_paths
-)
+# Optional Parquet output of the prediction columns
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
 
 # ==============================================================================
 # Configuration (extracted from use case)
@@ -36,6 +58,9 @@ DEFAULT_CONFIG = {
     "allele": "HLA-A02:01",
     "prediction_mode": "both",  # "EL", "BA", or "both"
     "rank_threshold": None,
+    "chunk_size": None,  # peptides per parallel NetMHCpan run (None = single run)
+    "max_workers": None,  # parallel runs when chunking (None = CPU count)
+    "emit_parquet": False,  # also write predictions to <output>.parquet (needs pyarrow)
     "output_format": "text",
     "log_level": "INFO"
 }
@@ -43,117 +68,337 @@ DEFAULT_CONFIG = {
 # ==============================================================================
 # Enhanced Parsing Function for Binding Affinity Results
 # ==============================================================================
+# Columns of a parsed row, in the order they are collected
+PREDICTION_COLUMNS = ('peptide', 'allele', 'el_score', 'el_rank', 'ba_score', 'ba_rank')
+
+
+def _iter_result_lines(f) -> Iterator[bytes]:
+    """
+    Yield the raw lines that follow the first separator line of a NetMHCpan output.
+
+    The file is memory-mapped and the separator is located with a single
+    search, so header lines are never tested one by one.
+
+    Args:
+        f: NetMHCpan output file opened in binary mode
+
+    Yields:
+        Lines (bytes) after the first '-----' separator line
+    """
+    if os.fstat(f.fileno()).st_size == 0:
+        return  # empty files cannot be mapped
+
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        if buf[:5] == b'-----':
+            separator = 0
+        else:
+            separator = buf.find(b'\n-----')
+            if separator < 0:
+                return
+            separator += 1
+
+        buf.seek(separator)
+        buf.readline()
+        yield from iter(buf.readline, b'')
+
+
+def _skip_to_results(lines: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Advance a line iterator past the first '-----' separator line.
+
+    Args:
+        lines: Raw NetMHCpan output lines (bytes), e.g. a subprocess pipe
+
+    Returns:
+        Iterator positioned on the first line after the separator
+    """
+    lines = iter(lines)
+    for line in lines:
+        if line.startswith(b'-----'):
+            break
+    return lines
+
+
+def _collect_rows(result_lines: Iterable[bytes]) -> Dict[str, list]:
+    """
+    Parse result lines into row tuples grouped by allele.
+
+    Args:
+        result_lines: Raw lines (bytes) following the header separator
+
+    Returns:
+        Mapping of allele name to list of row tuples (see PREDICTION_COLUMNS)
+    """
+    rows_by_allele = {}
+    allele_names = {}
+
+    # Work on raw bytes: float() accepts bytes directly, so only the
+    # peptide and allele fields are decoded. Later separator, header and
+    # summary lines fail the column/float checks below.
+    for line in result_lines:
+        try:
+            # Standard output with EL+BA has 11+ columns. Only the
+            # first 10 are used, so split at most 10 times and unpack
+            # the fixed schema directly: short rows fail the unpack
+            # and non-numeric rows fail float(), both as ValueError.
+            (_, allele_field, peptide, _, _, _,
+             el_score, el_rank, ba_score, ba_rank, _) = line.split(None, 10)
+            row_values = (
+                float(el_score),
+                float(el_rank),
+                float(ba_score),  # IC50 binding affinity
+                float(ba_rank)
+            )
+        except ValueError:
+            # Skip malformed lines
+            continue
+
+        allele = allele_names.get(allele_field)
+        if allele is None:
+            allele = allele_names[allele_field] = allele_field.decode()
+            rows_by_allele[allele] = []
+        rows_by_allele[allele].append((peptide.decode(), allele) + row_values)
+
+    return rows_by_allele
+
+
+def _summarize_rows(rows: list) -> Dict[str, Any]:
+    """
+    Transpose parsed rows into prediction columns and count binders.
+
+    Args:
+        rows: List of row tuples ordered as PREDICTION_COLUMNS
+
+    Returns:
+        Summary dict with counts and 'predictions' as a dict of columns
+    """
+    if rows:
+        columns = dict(zip(PREDICTION_COLUMNS, map(list, zip(*rows))))
+    else:
+        columns = {name: [] for name in PREDICTION_COLUMNS}
+
+    # Use EL rank for classification (more commonly used), against the same
+    # %Rank thresholds as lib.utils. The comparisons run as map() over bound
+    # float methods, so the per-row work happens in C without a Python-level
+    # branch per row.
+    el_ranks = columns['el_rank']
+    strong = list(map(STRONG_BINDER_RANK.__ge__, el_ranks))  # rank <= 0.5
+    binders = list(map(WEAK_BINDER_RANK.__ge__, el_ranks))   # rank <= 2.0
+    columns['strong_binder'] = strong
+    columns['weak_binder'] = list(map(operator.ne, binders, strong))
+    strong_binders = sum(strong)
+
+    return {
+        'strong_binders': strong_binders,
+        'weak_binders': sum(binders) - strong_binders,
+        'total_lines': len(rows),
+        'predictions': columns
+    }
+
+
+def _build_binding_results(rows_by_allele: Dict[str, list], logger) -> Dict[str, Any]:
+    """
+    Summarize parsed rows (see _collect_rows) overall and per allele, and log the summary.
+
+    Args:
+        rows_by_allele: Mapping of allele name to list of row tuples
+        logger: Logger instance
+
+    Returns:
+        Binding affinity results (see parse_binding_affinity_results)
+    """
+    per_allele = {
+        allele: _summarize_rows(rows)
+        for allele, rows in rows_by_allele.items()
+    }
+
+    if len(per_allele) == 1:
+        # Single allele: share the columns instead of copying them
+        result = dict(next(iter(per_allele.values())))
+    else:
+        result = _summarize_rows([
+            row for rows in rows_by_allele.values() for row in rows
+        ])
+    result['per_allele'] = per_allele
+    result['has_binding_affinities'] = True
+
+    strong_binders = result['strong_binders']
+    weak_binders = result['weak_binders']
+    total_lines = result['total_lines']
+    predictions = result['predictions']
+
+    # Enhanced summary logging for binding affinities
+    logger.info("=== Binding Affinity Prediction Summary ===")
+    logger.info(f"Strong binders (≤0.5% EL rank): {strong_binders}")
+    logger.info(f"Weak binders (≤2.0% EL rank): {weak_binders}")
+    logger.info(f"Total peptides analyzed: {total_lines}")
+
+    # Show top binding affinities if available
+    if total_lines:
+        ba_scores = predictions['ba_score']
+        top = heapq.nsmallest(3, range(total_lines), key=ba_scores.__getitem__)
+        logger.info("Top binding affinities (IC50 nM):")
+        for i, idx in enumerate(top, 1):
+            logger.info(f"  {i}. {predictions['peptide'][idx]}: {ba_scores[idx]:.2f} nM (EL: {predictions['el_rank'][idx]:.3f}%)")
+
+    return result
+
+
 def parse_binding_affinity_results(
-    output_file: Union[str, Path],
+    output_file: Union[str, Path, Iterable[bytes]],
     logger: Optional[object] = None
 ) -> Dict[str, Any]:
     """
     Parse NetMHCpan output specifically for binding affinity predictions.
 
     Enhanced version that handles both EL and BA prediction columns.
+    Predictions are returned column-wise ({'peptide': [...], 'el_rank': [...],
+    ...}) rather than as one dict per row, which keeps large outputs compact.
 
     Args:
-        output_file: Path to NetMHCpan output file
+        output_file: Path to NetMHCpan output file, or an iterable of raw
+            output lines (bytes) such as a subprocess stdout pipe
         logger: Logger instance
 
     Returns:
-        Dictionary with detailed binding affinity results
+        Dictionary with detailed binding affinity results, including a
+        'per_allele' split of the summary keyed by the MHC column
     """
     if logger is None:
-        from lib.utils import setup_logger
         logger = setup_logger()
 
     try:
-        with open(output_file, 'r') as f:
-            lines = f.readlines()
-
-        results_started = False
-        strong_binders = 0
-        weak_binders = 0
-        total_lines = 0
-        predictions = []
-
-        for line in lines:
-            line = line.strip()
-
-            # Skip comment lines
-            if line.startswith('#'):
-                continue
-
-            # Look for separator line
-            if line.startswith("-----"):
-                results_started = True
-                continue
-
-            # Process result lines
-            if results_started and line:
-                parts = line.split()
-                if len(parts) >= 11:  # Standard output with EL+BA has 11+ columns
-                    try:
-                        total_lines += 1
-
-                        # Extract key values (adjust indices based on NetMHCpan output format)
-                        peptide = parts[2] if len(parts) > 2 else ''
-                        allele = parts[1] if len(parts) > 1 else ''
-                        el_score = float(parts[6]) if len(parts) > 6 else 0.0
-                        el_rank = float(parts[7]) if len(parts) > 7 else 100.0
-                        ba_score = float(parts[8]) if len(parts) > 8 else 0.0
-                        ba_rank = float(parts[9]) if len(parts) > 9 else 100.0
-
-                        # Use EL rank for classification (more commonly used)
-                        if el_rank <= 0.5:
-                            strong_binders += 1
-                        elif el_rank <= 2.0:
-                            weak_binders += 1
-
-                        # Store detailed prediction
-                        predictions.append({
-                            'peptide': peptide,
-                            'allele': allele,
-                            'el_score': el_score,
-                            'el_rank': el_rank,
-                            'ba_score': ba_score,  # IC50 binding affinity
-                            'ba_rank': ba_rank,
-                            'strong_binder': el_rank <= 0.5,
-                            'weak_binder': 0.5 < el_rank <= 2.0
-                        })
-
-                    except (ValueError, IndexError):
-                        # Skip malformed lines
-                        continue
-
-        result = {
-            'strong_binders': strong_binders,
-            'weak_binders': weak_binders,
-            'total_lines': total_lines,
-            'predictions': predictions,
-            'has_binding_affinities': True
-        }
-
-        # Enhanced summary logging for binding affinities
-        logger.info("=== Binding Affinity Prediction Summary ===")
-        logger.info(f"Strong binders (≤0.5% EL rank): {strong_binders}")
-        logger.info(f"Weak binders (≤2.0% EL rank): {weak_binders}")
-        logger.info(f"Total peptides analyzed: {total_lines}")
+        if isinstance(output_file, (str, Path)):
+            with open(output_file, 'rb') as f:
+                rows_by_allele = _collect_rows(_iter_result_lines(f))
+        else:
+            rows_by_allele = _collect_rows(_skip_to_results(output_file))
 
-        # Show top binding affinities if available
-        if predictions:
-            sorted_preds = sorted(predictions, key=lambda x: x['ba_score'])[:3]
-            logger.info("Top binding affinities (IC50 nM):")
-            for i, pred in enumerate(sorted_preds, 1):
-                logger.info(f"  {i}. {pred['peptide']}: {pred['ba_score']:.2f} nM (EL: {pred['el_rank']:.3f}%)")
-
-        return result
+        return _build_binding_results(rows_by_allele, logger)
 
     except Exception as e:
         logger.warning(f"Could not parse binding affinity results: {str(e)}")
-        return {
-            'strong_binders': 0,
-            'weak_binders': 0,
-            'total_lines': 0,
-            'predictions': [],
-            'has_binding_affinities': False
-        }
+        result = _summarize_rows([])
+        result['per_allele'] = {}
+        result['has_binding_affinities'] = False
+        return result
+
+def _split_peptide_file(
+    input_file: Path,
+    chunk_size: int,
+    chunk_dir: Path
+) -> List[Path]:
+    """
+    Split a peptide file into chunk files of at most chunk_size peptides.
+
+    Args:
+        input_file: Peptide file, one peptide per line
+        chunk_size: Maximum number of peptides per chunk
+        chunk_dir: Directory to write chunk_<i>.pep files to
+
+    Returns:
+        Chunk file paths, in input order
+    """
+    chunks = []
+    out = None
+    written = 0
+    try:
+        with open(input_file, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if written % chunk_size == 0:
+                    if out is not None:
+                        out.close()
+                    chunk = chunk_dir / f"chunk_{len(chunks)}.pep"
+                    chunks.append(chunk)
+                    out = open(chunk, 'wb')
+                out.write(line if line.endswith(b'\n') else line + b'\n')
+                written += 1
+    finally:
+        if out is not None:
+            out.close()
+    return chunks
+
+
+def _run_chunked_prediction(
+    chunks: List[Path],
+    chunk_cmds: List[list],
+    output_file: Optional[Path],
+    max_workers: Optional[int],
+    logger
+) -> Optional[Dict[str, Any]]:
+    """
+    Run one NetMHCpan process per peptide chunk in parallel and merge the results.
+
+    Each worker thread only streams and parses its process's output; the
+    predictions themselves run in the NetMHCpan processes. If output_file is
+    given, the raw chunk outputs are concatenated into it in chunk order.
+
+    Args:
+        chunks: Chunk peptide files (see _split_peptide_file)
+        chunk_cmds: The NetMHCpan command for each chunk
+        output_file: Optional file to save the combined raw output to
+        max_workers: Maximum concurrent NetMHCpan processes (None = CPU count)
+        logger: Logger instance
+
+    Returns:
+        Merged binding affinity results, or None if any chunk failed
+    """
+    if output_file is not None:
+        chunk_outputs = [chunk.with_suffix('.out') for chunk in chunks]
+    else:
+        chunk_outputs = [None] * len(chunk_cmds)
+
+    def run_chunk(i):
+        return run_netmhcpan_streaming(
+            chunk_cmds[i],
+            lambda lines: _collect_rows(_skip_to_results(lines)),
+            chunk_outputs[i],
+            logger
+        )
+
+    workers = min(len(chunk_cmds), max_workers or os.cpu_count() or 1)
+    logger.info(f"Running {len(chunk_cmds)} chunks on {workers} parallel NetMHCpan processes")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        runs = list(pool.map(run_chunk, range(len(chunk_cmds))))
+
+    if not all(success for success, _ in runs):
+        return None
+
+    # Chunks are merged in input order, so rows keep the input file order
+    rows_by_allele = {}
+    for _, chunk_rows in runs:
+        for allele, rows in chunk_rows.items():
+            rows_by_allele.setdefault(allele, []).extend(rows)
+
+    if output_file is not None:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_file, 'wb') as out:
+            for chunk_output in chunk_outputs:
+                with open(chunk_output, 'rb') as f:
+                    shutil.copyfileobj(f, out)
+
+    return _build_binding_results(rows_by_allele, logger)
+
+def write_predictions_parquet(predictions: Dict[str, list], parquet_file: Path) -> None:
+    """
+    Write parsed prediction columns to a zstd-compressed Parquet file.
+
+    The predictions are already column-wise, so they map straight onto an
+    Arrow table; downstream tools can load them without re-parsing the
+    NetMHCpan text output.
+
+    Args:
+        predictions: Mapping of column name to list of values
+            (results['predictions'] from parse_binding_affinity_results)
+        parquet_file: Path to output .parquet file
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pq.write_table(pa.table(predictions), str(parquet_file), compression="zstd")
+
 
 # ==============================================================================
 # Core Function (main logic extracted from use case)
@@ -162,6 +407,7 @@ def run_binding_affinity_prediction(
     input_file: Union[str, Path],
     output_file: Optional[Union[str, Path]] = None,
     config: Optional[Dict[str, Any]] = None,
+    netmhcpan_script: Optional[Union[str, Path]] = None,
     **kwargs
 ) -> Dict[str, Any]:
     """
@@ -169,24 +415,27 @@ def run_binding_affinity_prediction(
 
     Args:
         input_file: Path to input peptide file
-        output_file: Path to save output (optional, auto-generated if not provided)
+        output_file: Path to save the raw NetMHCpan output (optional; if not
+            provided, output is parsed straight from the pipe and not saved)
         config: Configuration dict (uses DEFAULT_CONFIG if not provided)
+        netmhcpan_script: NetMHCpan executable from an earlier
+            setup_netmhcpan_env() call (set up here if not provided)
         **kwargs: Override specific config parameters
 
     Returns:
         Dict containing:
             - success: Boolean indicating if prediction succeeded
-            - output_file: Path to output file
+            - output_file: Path to output file (None if not saved)
             - results: Parsed results summary with binding affinities
             - metadata: Execution metadata
 
     Example:
         >>> result = run_binding_affinity_prediction("test.pep", "output.txt", allele="HLA-B07:02")
-        >>> print(f"Best IC50: {min(p['ba_score'] for p in result['results']['predictions'])}")
+        >>> print(f"Best IC50: {min(result['results']['predictions']['ba_score'])}")
     """
     # Setup
     input_file = Path(input_file)
-    config = {**DEFAULT_CONFIG, **(config or {}), **kwargs}
+    config = ChainMap(kwargs, config or {}, DEFAULT_CONFIG)
 
     # Setup logger
     logger = setup_logger("binding_affinity", config.get("log_level", "INFO"))
@@ -197,21 +446,19 @@ def run_binding_affinity_prediction(
         logger.error(error_msg)
         raise FileNotFoundError(error_msg)
 
-    # Auto-generate output file if not provided
-    if output_file is None:
-        mode_suffix = config["prediction_mode"].lower()
-        output_file = input_file.parent / f"{input_file.stem}_binding_{mode_suffix}.txt"
-    else:
+    # Raw output is only written to disk when explicitly requested
+    if output_file is not None:
         output_file = Path(output_file)
 
     logger.info(f"Starting binding affinity prediction for: {input_file}")
     logger.info(f"Allele: {config['allele']}")
     logger.info(f"Prediction mode: {config['prediction_mode']}")
-    logger.info(f"Output: {output_file}")
+    logger.info(f"Output: {output_file or 'not saved (parsed from stream)'}")
 
     try:
-        # Setup NetMHCpan environment
-        netmhcpan_script = setup_netmhcpan_env()
+        # Setup NetMHCpan environment (unless the caller already did)
+        if netmhcpan_script is None:
+            netmhcpan_script = setup_netmhcpan_env()
 
         # Build command - enable both EL and BA predictions
         cmd = [
@@ -233,26 +480,60 @@ def run_binding_affinity_prediction(
         if config.get("rank_threshold") is not None:
             cmd.extend(["-t", str(config["rank_threshold"])])
 
-        # Run prediction
-        success = run_netmhcpan_command(cmd, output_file, logger)
+        # The chunk directory is only created when chunking is enabled
+        chunk_size = config.get("chunk_size")
+        chunk_stage = (
+            tempfile.TemporaryDirectory(prefix="netmhcpan_chunks_")
+            if chunk_size else nullcontext()
+        )
+        with chunk_stage as chunk_dir:
+            chunks = _split_peptide_file(input_file, int(chunk_size), Path(chunk_dir)) if chunk_size else []
+
+            if len(chunks) > 1:
+                # Large peptide files: one NetMHCpan process per chunk,
+                # with the chunk file in place of the input file (cmd[4])
+                chunk_cmds = [[*cmd[:4], str(chunk), *cmd[5:]] for chunk in chunks]
+                results = _run_chunked_prediction(
+                    chunks, chunk_cmds, output_file, config.get("max_workers"), logger
+                )
+                success = results is not None
+            else:
+                # Run prediction, parsing the output as it streams from NetMHCpan
+                # (and saving it on the way through if an output file was given)
+                success, results = run_netmhcpan_streaming(
+                    cmd,
+                    lambda lines: parse_binding_affinity_results(lines, logger),
+                    output_file,
+                    logger
+                )
 
         # Parse results with enhanced binding affinity parsing
-        results = {}
         if success:
-            results = parse_binding_affinity_results(output_file, logger)
             results["prediction_mode"] = config["prediction_mode"]
+            if config.get("emit_parquet"):
+                if output_file is None:
+                    logger.warning("emit_parquet needs an output file; Parquet not written")
+                elif not PYARROW_AVAILABLE:
+                    logger.warning("pyarrow is not installed; Parquet not written")
+                else:
+                    parquet_file = output_file.with_suffix(".parquet")
+                    write_predictions_parquet(results["predictions"], parquet_file)
+                    results["parquet_file"] = str(parquet_file)
+                    logger.info(f"Predictions saved to: {parquet_file}")
             logger.info(f"Binding affinity prediction completed successfully!")
         else:
+            results = {}
             logger.error("Binding affinity prediction failed")
 
         return {
             "success": success,
-            "output_file": str(output_file),
+            "output_file": str(output_file) if output_file else None,
             "results": results,
             "metadata": {
                 "input_file": str(input_file),
-                "config": config,
-                "command": " ".join(cmd)
+                "config": dict(config),
+                "command": cmd,
+                "chunks": max(len(chunks), 1)
             }
         }
 
@@ -264,15 +545,149 @@ def run_binding_affinity_prediction(
             "results": {},
             "metadata": {
                 "input_file": str(input_file),
-                "config": config,
+                "config": dict(config),
                 "error": str(e)
             }
         }
 
+
+def run_multi_allele_prediction(
+    input_file: Union[str, Path],
+    alleles: Union[str, List[str]],
+    output_file: Optional[Union[str, Path]] = None,
+    config: Optional[Dict[str, Any]] = None,
+    netmhcpan_script: Optional[Union[str, Path]] = None,
+    **kwargs
+) -> Dict[str, Any]:
+    """
+    Predict binding affinities for several alleles in a single NetMHCpan run.
+
+    NetMHCpan accepts a comma-separated allele list, so the model is loaded
+    once for all alleles instead of once per allele. Results are split back
+    per allele afterwards.
+
+    Args:
+        input_file: Path to input peptide file
+        alleles: HLA alleles (string "A,B,C" or list ["A", "B", "C"])
+        output_file: Path to save output (optional, auto-generated if not provided)
+        config: Configuration dict (uses DEFAULT_CONFIG if not provided)
+        netmhcpan_script: NetMHCpan executable from an earlier
+            setup_netmhcpan_env() call (set up here if not provided)
+        **kwargs: Override specific config parameters
+
+    Returns:
+        Same structure as run_binding_affinity_prediction, with
+        results['per_allele'] keyed by the requested allele names.
+        Alleles missing from the combined output, or all of them if the
+        combined run fails, are re-run alone (with their own 'output_file'
+        in their summary) and the totals are rebuilt from the split; alleles
+        that still fail are left out and listed in results['failed_alleles']
+
+    Example:
+        >>> result = run_multi_allele_prediction("test.pep", ["HLA-A01:01", "HLA-A02:01"])
+        >>> print(result['results']['per_allele']['HLA-A01:01']['strong_binders'])
+    """
+    if isinstance(alleles, str):
+        alleles_list = [a.strip() for a in alleles.split(',') if a.strip()]
+    else:
+        alleles_list = list(alleles)
+
+    result = run_binding_affinity_prediction(
+        input_file,
+        output_file=output_file,
+        config=config,
+        netmhcpan_script=netmhcpan_script,
+        **{**kwargs, "allele": ",".join(alleles_list)}
+    )
+
+    logger = setup_logger(
+        "binding_affinity",
+        ChainMap(kwargs, config or {}, DEFAULT_CONFIG).get("log_level", "INFO")
+    )
+
+    per_allele = {}
+    if result["success"]:
+        # Re-key the per-allele split by the names the caller asked for
+        reported = {
+            normalize_allele_name(name): summary
+            for name, summary in result["results"].get("per_allele", {}).items()
+        }
+        for allele in alleles_list:
+            summary = reported.get(normalize_allele_name(allele))
+            if summary is not None:
+                per_allele[allele] = summary
+        pending_alleles = [allele for allele in alleles_list if allele not in per_allele]
+        if pending_alleles:
+            # NetMHCpan reported these under a name that does not match
+            # the request; run them alone instead of guessing
+            logger.warning(
+                f"No output matched {', '.join(pending_alleles)} - re-running them one allele per run"
+            )
+    else:
+        # Some builds reject allele lists; retry one allele per run
+        logger.warning("Batched NetMHCpan run failed - falling back to one run per allele")
+        pending_alleles = alleles_list
+
+    failed_alleles = []
+    for allele in pending_alleles:
+        # A given output file gets a per-allele sibling for each re-run
+        allele_output = None
+        if output_file is not None:
+            output_path = Path(output_file)
+            allele_tag = allele.replace(":", "").replace("*", "")
+            allele_output = output_path.with_name(f"{output_path.stem}_{allele_tag}{output_path.suffix}")
+        single = run_binding_affinity_prediction(
+            input_file,
+            output_file=allele_output,
+            config=config,
+            netmhcpan_script=netmhcpan_script,
+            **{**kwargs, "allele": allele}
+        )
+        if single["success"]:
+            summary = {
+                key: single["results"][key]
+                for key in ('strong_binders', 'weak_binders', 'total_lines', 'predictions')
+            }
+            summary["output_file"] = single["output_file"]
+            per_allele[allele] = summary
+        else:
+            logger.error(f"Prediction failed for allele {allele}")
+            failed_alleles.append(allele)
+
+    if pending_alleles and per_allele:
+        # Re-runs replaced (part of) the batched split, so the totals are
+        # rebuilt from the per-allele summaries in the requested order
+        summaries = [per_allele[allele] for allele in alleles_list if allele in per_allele]
+        results = result["results"] if result["success"] else {
+            "prediction_mode": ChainMap(kwargs, config or {}, DEFAULT_CONFIG)["prediction_mode"],
+            "has_binding_affinities": True
+        }
+        results.update({
+            "strong_binders": sum(summary["strong_binders"] for summary in summaries),
+            "weak_binders": sum(summary["weak_binders"] for summary in summaries),
+            "total_lines": sum(summary["total_lines"] for summary in summaries),
+            "predictions": {
+                key: [value for summary in summaries for value in summary["predictions"][key]]
+                for key in summaries[0]["predictions"]
+            }
+        })
+        if not result["success"]:
+            # The file of the failed batched run does not hold these results
+            result["output_file"] = None
+        result["success"] = True
+        result["results"] = results
+
+    if result["success"]:
+        result["results"]["per_allele"] = per_allele
+        result["results"]["failed_alleles"] = failed_alleles
+    result["metadata"]["alleles"] = alleles_list
+    return result
+
 # ==============================================================================
 # CLI Interface
 # ==============================================================================
-def main():
+@lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description=__doc__,
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -287,6 +702,12 @@ Examples:
   # Different allele with rank filtering
   python scripts/binding_affinity_prediction.py --input test.pep --allele HLA-B07:02 --rank-threshold 2.0
 
+  # Several alleles in a single NetMHCpan run
+  python scripts/binding_affinity_prediction.py --input test.pep --alleles HLA-A02:01,HLA-B07:02
+
+  # Large peptide library, 1000 peptides per parallel NetMHCpan run
+  python scripts/binding_affinity_prediction.py --input library.pep --chunk-size 1000
+
   # Use custom config file
   python scripts/binding_affinity_prediction.py --input test.pep --config configs/affinity.json
         """
@@ -299,7 +720,7 @@ Examples:
     )
     parser.add_argument(
         '--output', '-o',
-        help='Output file path (auto-generated if not specified)'
+        help='Output file path for the raw NetMHCpan output (default: <input>_binding_<mode>.txt next to the input)'
     )
     parser.add_argument(
         '--allele', '-a',
@@ -307,7 +728,12 @@ Examples:
         help=f'HLA allele for prediction (default: {DEFAULT_CONFIG["allele"]})'
     )
     parser.add_argument(
-        '--mode', '-m',
+        '--alleles',
+        help='Comma-separated HLA alleles, predicted in one NetMHCpan run and split per allele'
+    )
+    parser.add_argument(
+        '--mode', '--prediction-mode', '-m',
+        dest='mode',
         choices=['EL', 'BA', 'both'],
         default=DEFAULT_CONFIG["prediction_mode"],
         help=f'Prediction mode: EL (eluted ligand), BA (binding affinity), or both (default: {DEFAULT_CONFIG["prediction_mode"]})'
@@ -317,6 +743,16 @@ Examples:
         type=float,
         help='Rank threshold for output filtering (e.g., 2.0 for ≤2%% rank)'
     )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        help='Split the input into chunks of this many peptides and predict them in parallel'
+    )
+    parser.add_argument(
+        '--parquet',
+        action='store_true',
+        help='Also write the parsed predictions to <output>.parquet (requires pyarrow)'
+    )
     parser.add_argument(
         '--config', '-c',
         help='Config file (JSON)'
@@ -328,13 +764,14 @@ Examples:
         help='Logging level'
     )
 
-    args = parser.parse_args()
+    return parser
+
+
+def main():
+    args = _build_parser().parse_args()
 
     # Load config if provided
-    config = None
-    if args.config:
-        with open(args.config) as f:
-            config = json.load(f)
+    config = load_config(args.config) if args.config else None
 
     # Override config with command line arguments
     cli_overrides = {}
@@ -344,20 +781,41 @@ Examples:
         cli_overrides["prediction_mode"] = args.mode
     if args.rank_threshold is not None:
         cli_overrides["rank_threshold"] = args.rank_threshold
+    if args.chunk_size is not None:
+        cli_overrides["chunk_size"] = args.chunk_size
+    if args.parquet:
+        cli_overrides["emit_parquet"] = True
     if args.log_level != DEFAULT_CONFIG["log_level"]:
         cli_overrides["log_level"] = args.log_level
 
+    # The CLI always saves the raw output (the API only does so on request),
+    # so batch jobs running this script keep the per-peptide predictions
+    output_file = args.output
+    if output_file is None:
+        mode_suffix = ChainMap(cli_overrides, config or {}, DEFAULT_CONFIG)["prediction_mode"].lower()
+        input_path = Path(args.input)
+        output_file = input_path.parent / f"{input_path.stem}_binding_{mode_suffix}.txt"
+
     # Run prediction
     try:
-        result = run_binding_affinity_prediction(
-            input_file=args.input,
-            output_file=args.output,
-            config=config,
-            **cli_overrides
-        )
+        if args.alleles:
+            result = run_multi_allele_prediction(
+                input_file=args.input,
+                alleles=args.alleles,
+                output_file=output_file,
+                config=config,
+                **cli_overrides
+            )
+        else:
+            result = run_binding_affinity_prediction(
+                input_file=args.input,
+                output_file=output_file,
+                config=config,
+                **cli_overrides
+            )
 
         if result["success"]:
-            print(f"✅ Success: {result['output_file']}")
+            print(f"✅ Success: {result['output_file'] or 'per-allele output files listed below'}")
             results = result.get("results", {})
             if results:
                 print(f"   Strong binders: {results.get('strong_binders', 0)}")
@@ -366,10 +824,15 @@ Examples:
                 print(f"   Prediction mode: {results.get('prediction_mode', 'N/A')}")
 
                 # Show best binding affinity if available
-                predictions = results.get('predictions', [])
-                if predictions:
-                    best_ic50 = min(p['ba_score'] for p in predictions)
+                ba_scores = results.get('predictions', {}).get('ba_score', [])
+                if ba_scores:
+                    best_ic50 = min(ba_scores)
                     print(f"   Best IC50: {best_ic50:.2f} nM")
+
+                if args.alleles:
+                    for allele, summary in results.get('per_allele', {}).items():
+                        allele_file = f" ({summary['output_file']})" if summary.get('output_file') else ""
+                        print(f"   {allele}: {summary['strong_binders']} strong, {summary['weak_binders']} weak{allele_file}")
             return 0
         else:
             print(f"❌ Failed: {result.get('metadata', {}).get('error', 'Unknown error')}")
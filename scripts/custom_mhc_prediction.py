@@ -17,17 +17,25 @@ Example:
 # Minimal Imports (only essential packages)
 # ==============================================================================
 import argparse
-import json
 import sys
+from collections import ChainMap
+from functools import lru_cache
 from pathlib import Path
 from typing import Union, Optional, Dict, Any
 
-# Local imports
-sys.path.insert(0, str(Path(__file__).parent))
-from lib.utils import (
-    setup_logger, setup_netmhcpan_env, run_netmhcpan_command,
-    parse_netmhcpan_results, validate_input_file, get_mcp_paths
-)
+# Local imports: a package import when loaded as part of the scripts package
+# (e.g. by the MCP server); run directly, the script's own directory is used
+try:
+    from .lib.utils import (
+        setup_logger, setup_netmhcpan_env, run_netmhcpan_command,
+        parse_netmhcpan_results, stat_input_file, get_mcp_paths, load_config
+    )
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent))
+    from lib.utils import (
+        setup_logger, setup_netmhcpan_env, run_netmhcpan_command,
+        parse_netmhcpan_results, stat_input_file, get_mcp_paths, load_config
+    )
 
 # ==============================================================================
 # Configuration (extracted from use case)
@@ -47,6 +55,7 @@ def run_custom_mhc_prediction(
     mhc_sequence_file: Union[str, Path],
     output_file: Optional[Union[str, Path]] = None,
     config: Optional[Dict[str, Any]] = None,
+    netmhcpan_script: Optional[Union[str, Path]] = None,
     **kwargs
 ) -> Dict[str, Any]:
     """
@@ -57,6 +66,8 @@ def run_custom_mhc_prediction(
         mhc_sequence_file: Path to custom MHC sequence FASTA file
         output_file: Path to save output (optional, auto-generated if not provided)
         config: Configuration dict (uses DEFAULT_CONFIG if not provided)
+        netmhcpan_script: NetMHCpan executable from an earlier
+            setup_netmhcpan_env() call (set up here if not provided)
         **kwargs: Override specific config parameters
 
     Returns:
@@ -73,18 +84,21 @@ def run_custom_mhc_prediction(
     # Setup
     input_file = Path(input_file)
     mhc_sequence_file = Path(mhc_sequence_file)
-    config = {**DEFAULT_CONFIG, **(config or {}), **kwargs}
+    config = ChainMap(kwargs, config or {}, DEFAULT_CONFIG)
 
     # Setup logger
     logger = setup_logger("custom_mhc_prediction", config.get("log_level", "INFO"))
 
-    # Validate inputs
-    if not validate_input_file(input_file):
-        error_msg = f"Input file not found or not readable: {input_file}"
-        logger.error(error_msg)
-        raise FileNotFoundError(error_msg)
+    # Validate inputs (one stat per file; sizes are reused for logging)
+    try:
+        input_stat = stat_input_file(input_file)
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        raise
 
-    if not validate_input_file(mhc_sequence_file):
+    try:
+        mhc_stat = stat_input_file(mhc_sequence_file)
+    except FileNotFoundError:
         error_msg = f"MHC sequence file not found or not readable: {mhc_sequence_file}"
         logger.error(error_msg)
         raise FileNotFoundError(error_msg)
@@ -95,14 +109,15 @@ def run_custom_mhc_prediction(
     else:
         output_file = Path(output_file)
 
-    logger.info(f"Starting custom MHC prediction for: {input_file}")
-    logger.info(f"Custom MHC sequence: {mhc_sequence_file}")
+    logger.info(f"Starting custom MHC prediction for: {input_file} ({input_stat.st_size} bytes)")
+    logger.info(f"Custom MHC sequence: {mhc_sequence_file} ({mhc_stat.st_size} bytes)")
     logger.info(f"MHC name: {config['mhc_name']}")
     logger.info(f"Output: {output_file}")
 
     try:
-        # Setup NetMHCpan environment
-        netmhcpan_script = setup_netmhcpan_env()
+        # Setup NetMHCpan environment (unless the caller already did)
+        if netmhcpan_script is None:
+            netmhcpan_script = setup_netmhcpan_env()
 
         # Build command
         cmd = [
@@ -138,8 +153,8 @@ def run_custom_mhc_prediction(
             "metadata": {
                 "input_file": str(input_file),
                 "mhc_sequence_file": str(mhc_sequence_file),
-                "config": config,
-                "command": " ".join(cmd)
+                "config": dict(config),
+                "command": cmd
             }
         }
 
@@ -152,7 +167,7 @@ def run_custom_mhc_prediction(
             "metadata": {
                 "input_file": str(input_file),
                 "mhc_sequence_file": str(mhc_sequence_file),
-                "config": config,
+                "config": dict(config),
                 "error": str(e)
             }
         }
@@ -160,7 +175,8 @@ def run_custom_mhc_prediction(
 # ==============================================================================
 # CLI Interface
 # ==============================================================================
-def main():
+@lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description=__doc__,
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -215,13 +231,14 @@ Examples:
         help='Logging level'
     )
 
-    args = parser.parse_args()
+    return parser
+
+
+def main():
+    args = _build_parser().parse_args()
 
     # Load config if provided
-    config = None
-    if args.config:
-        with open(args.config) as f:
-            config = json.load(f)
+    config = load_config(args.config) if args.config else None
 
     # Override config with command line arguments
     cli_overrides = {}
@@ -5,7 +5,7 @@ Description: Predict MHC Class I binding for multiple alleles with Excel export
 
 Original Use Case: examples/use_case_5_excel_export.py
 Dependencies Removed: loguru (replaced with standard logging)
-Dependencies Added: pandas (for Excel export functionality)
+Dependencies Added: xlsxwriter or openpyxl (optional, for .xlsx export)
 
 Usage:
     python scripts/excel_export.py --input <peptide_file> --alleles <allele_list> --excel-file <output.xls>
@@ -18,44 +18,227 @@ Example:
 # Minimal Imports (only essential packages)
 # ==============================================================================
 import argparse
-import json
+import csv
+import heapq
+import importlib.util
+import os
+import shutil
 import sys
+import tempfile
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
-from typing import Union, Optional, Dict, Any, List
-
-# Optional pandas import for Excel functionality
+from typing import Union, Optional, Dict, Any, List, Tuple
+
+# Optional Excel writers. Only their availability is checked here; they are
+# imported where .xlsx output is written so tab-delimited runs never load
+# the writer libraries. Faster writers are preferred when installed.
+RUSTPY_XLSXWRITER_AVAILABLE = importlib.util.find_spec("rustpy_xlsxwriter") is not None
+PYEXCELERATE_AVAILABLE = importlib.util.find_spec("pyexcelerate") is not None
+XLSXWRITER_AVAILABLE = importlib.util.find_spec("xlsxwriter") is not None
+OPENPYXL_AVAILABLE = importlib.util.find_spec("openpyxl") is not None
+
+if RUSTPY_XLSXWRITER_AVAILABLE:
+    XLSX_BACKEND = "rustpy_xlsxwriter"
+elif PYEXCELERATE_AVAILABLE:
+    XLSX_BACKEND = "pyexcelerate"
+elif XLSXWRITER_AVAILABLE:
+    XLSX_BACKEND = "xlsxwriter"
+elif OPENPYXL_AVAILABLE:
+    XLSX_BACKEND = "openpyxl"
+else:
+    XLSX_BACKEND = None
+
+# Local imports: a package import when loaded as part of the scripts package
+# (e.g. by the MCP server); run directly, the script's own directory is used
 try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
+    from .lib.utils import (
+        setup_logger, setup_netmhcpan_env, run_netmhcpan_streaming,
+        parse_netmhcpan_lines, validate_input_file, get_mcp_paths,
+        normalize_allele_name, load_config
+    )
 except ImportError:
-    PANDAS_AVAILABLE = False
-    pd = None
-
-# Local imports
-sys.path.insert(0, str(Path(__file__).parent))
-from lib.utils import (
-    setup_logger, setup_netmhcpan_env, run_netmhcpan_command,
-    parse_netmhcpan_results, validate_input_file, get_mcp_paths
-)
+    sys.path.insert(0, str(Path(__file__).parent))
+    from lib.utils import (
+        setup_logger, setup_netmhcpan_env, run_netmhcpan_streaming,
+        parse_netmhcpan_lines, validate_input_file, get_mcp_paths,
+        normalize_allele_name, load_config
+    )
 
 # ==============================================================================
 # Configuration (extracted from use case)
 # ==============================================================================
 DEFAULT_CONFIG = {
     "alleles": ["HLA-A02:01"],
-    "excel_format": "tab_delimited",  # "tab_delimited" or "xlsx" (requires openpyxl)
+    "excel_format": "auto",  # "auto" (from file extension), "xlsx", "csv" or "tsv"/"tab_delimited"
+    "batch_alleles": True,  # one NetMHCpan run for all alleles; False runs one per allele in parallel
     "rank_threshold": None,
+    "skip_ba": True,  # NetMHCpan default (EL only); False adds -BA, which is slower
+    "sort_output": False,  # True adds -s (sort rows by score)
+    "top_n": None,  # keep only the N best-ranked predictions per allele in the export
     "output_format": "text",
     "log_level": "INFO"
 }
 
+# Keys of the prediction dicts returned by parse_netmhcpan_lines
+PREDICTION_KEYS = ('peptide', 'allele', 'score', 'rank')
+
+# Export formats chosen from the file extension when excel_format is "auto";
+# anything else (including legacy .xls) is written tab-delimited
+SUFFIX_FORMATS = {'.xlsx': 'xlsx', '.csv': 'csv'}
+DELIMITERS = {'csv': ',', 'tsv': '\t'}
+
+# Characters dropped from allele names used in file names
+_ALLELE_TRANS = str.maketrans('', '', ':*')
+
 # ==============================================================================
 # Excel Export Functions
 # ==============================================================================
+def write_xlsx_rustpy(
+    excel_file: Path,
+    headers: List[str],
+    columns: Dict[str, list],
+    output_format: str = "xlsx"
+) -> None:
+    """
+    Write prediction columns with rustpy-xlsxwriter (Rust backend).
+
+    Args:
+        excel_file: Path to output file
+        headers: Column names in output order
+        columns: Mapping of column name to list of values
+        output_format: "xlsx", "csv" or "tsv" (independent of the extension)
+    """
+    from rustpy_xlsxwriter import FastExcel
+
+    records = (dict(zip(headers, row)) for row in zip(*(columns[h] for h in headers)))
+    FastExcel(
+        str(excel_file), output_format=output_format, columns=headers, autofit=False
+    ).sheet("Sheet1", records).save()
+
+
+def write_xlsx_pyexcelerate(
+    excel_file: Path,
+    headers: List[str],
+    columns: Dict[str, list]
+) -> None:
+    """
+    Write prediction columns to .xlsx with pyexcelerate.
+
+    Args:
+        excel_file: Path to output .xlsx file
+        headers: Column names in output order
+        columns: Mapping of column name to list of values
+    """
+    from pyexcelerate import Workbook
+
+    data = [headers]
+    data.extend(zip(*(columns[h] for h in headers)))
+    workbook = Workbook()
+    workbook.new_sheet("Sheet1", data=data)
+    workbook.save(str(excel_file))
+
+
+def write_xlsx_constant_memory(
+    excel_file: Path,
+    headers: List[str],
+    columns: Dict[str, list]
+) -> None:
+    """
+    Write prediction columns to .xlsx with xlsxwriter in constant-memory mode.
+
+    Rows are flushed to disk as they are written, so memory stays bounded
+    regardless of row count. Rows must therefore be written in order.
+
+    Args:
+        excel_file: Path to output .xlsx file
+        headers: Column names in output order
+        columns: Mapping of column name to list of values
+    """
+    import xlsxwriter
+
+    # Cell values are plain peptide/allele strings and floats: skip the
+    # per-string URL and formula checks xlsxwriter does by default
+    workbook = xlsxwriter.Workbook(str(excel_file), {
+        'constant_memory': True,
+        'strings_to_numbers': False,
+        'strings_to_formulas': False,
+        'strings_to_urls': False
+    })
+    try:
+        worksheet = workbook.add_worksheet()
+        write_row = worksheet.write_row
+        write_row(0, 0, headers)
+        for row_idx, row in enumerate(zip(*(columns[h] for h in headers)), 1):
+            write_row(row_idx, 0, row)
+    finally:
+        workbook.close()
+
+
+def write_xlsx_write_only(
+    excel_file: Path,
+    headers: List[str],
+    columns: Dict[str, list]
+) -> None:
+    """
+    Write prediction columns to .xlsx with openpyxl in write-only mode.
+
+    Like xlsxwriter's constant-memory mode, rows are streamed to disk as they
+    are appended instead of being held as cell objects.
+
+    Args:
+        excel_file: Path to output .xlsx file
+        headers: Column names in output order
+        columns: Mapping of column name to list of values
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Sheet1")
+    worksheet.append(headers)
+    for row in zip(*(columns[h] for h in headers)):
+        worksheet.append(row)
+    workbook.save(str(excel_file))
+
+
+def _collect_prediction_columns(
+    results_list: List[Dict[str, Any]]
+) -> Tuple[List[str], Dict[str, list]]:
+    """Collect per-allele prediction dicts into (headers, columns)."""
+    # Collect all predictions column-wise; the allele name is broadcast
+    # per allele instead of copied into every prediction dict
+    headers = []
+    columns = {}
+    for result in results_list:
+        allele_name = result.get('allele', 'Unknown')
+        predictions = result.get('results', {}).get('predictions', [])
+        if not predictions:
+            continue
+
+        if not headers:
+            headers = list(predictions[0].keys())
+            if 'allele' not in headers:
+                headers.append('allele')
+            columns = {h: [] for h in headers}
+
+        for h in headers:
+            if h == 'allele':
+                columns[h].extend([allele_name] * len(predictions))
+            else:
+                columns[h].extend([pred.get(h, '') for pred in predictions])
+
+    return headers, columns
+
+
 def create_excel_compatible_output(
     results_list: List[Dict[str, Any]],
     excel_file: Path,
-    logger: Optional[object] = None
+    logger: Optional[object] = None,
+    excel_format: str = "auto",
+    columns: Optional[Dict[str, list]] = None
 ) -> bool:
     """
     Create Excel-compatible output from NetMHCpan results.
@@ -64,60 +247,72 @@ def create_excel_compatible_output(
         results_list: List of result dictionaries from multiple alleles
         excel_file: Path to output Excel file
         logger: Logger instance
+        excel_format: "xlsx", "csv", "tsv" ("tab_delimited"), or "auto" to
+            pick from the file extension
+        columns: Prediction columns already collected by the caller (the
+            'allele' column holding the requested allele names); when given,
+            results_list is not scanned again
 
     Returns:
         True if export successful, False otherwise
     """
     if logger is None:
-        from lib.utils import setup_logger
         logger = setup_logger()
 
     try:
-        # Collect all predictions from all alleles
-        all_predictions = []
-        for result in results_list:
-            allele_name = result.get('allele', 'Unknown')
-            predictions = result.get('results', {}).get('predictions', [])
-
-            for pred in predictions:
-                # Add allele info to each prediction
-                pred_copy = pred.copy()
-                pred_copy['allele'] = allele_name
-                all_predictions.append(pred_copy)
-
-        if not all_predictions:
+        if columns is None:
+            headers, columns = _collect_prediction_columns(results_list)
+        else:
+            headers = list(columns) if any(columns.values()) else []
+
+        if not headers:
             logger.warning("No predictions found for Excel export")
             return False
 
-        # Create Excel-compatible format
-        if PANDAS_AVAILABLE and excel_file.suffix.lower() in ['.xlsx', '.xls']:
-            # Use pandas for true Excel format
-            df = pd.DataFrame(all_predictions)
+        # Reorder columns for better readability in spreadsheet output
+        preferred_order = ['peptide', 'allele', 'score', 'rank']
+        excel_headers = [col for col in preferred_order if col in headers]
+        excel_headers += [col for col in headers if col not in preferred_order]
 
-            # Reorder columns for better readability
-            preferred_order = ['peptide', 'allele', 'score', 'rank']
-            available_cols = [col for col in preferred_order if col in df.columns]
-            other_cols = [col for col in df.columns if col not in preferred_order]
-            df = df[available_cols + other_cols]
+        if excel_format == "auto":
+            excel_format = SUFFIX_FORMATS.get(excel_file.suffix.lower(), "tsv")
+        elif excel_format == "tab_delimited":
+            excel_format = "tsv"
 
-            # Save as Excel
-            df.to_excel(str(excel_file), index=False, engine='openpyxl' if excel_file.suffix == '.xlsx' else None)
-            logger.info(f"Excel file exported using pandas: {excel_file}")
+        # Without an .xlsx writer the export falls back to tab-delimited
+        backend = XLSX_BACKEND if excel_format == "xlsx" else None
+        if excel_format == "xlsx" and backend is None:
+            excel_format = "tsv"
 
-        else:
-            # Create tab-delimited format (Excel compatible)
-            with open(excel_file, 'w') as f:
-                if all_predictions:
-                    # Write header
-                    headers = list(all_predictions[0].keys())
-                    f.write('\t'.join(headers) + '\n')
+        if backend == "rustpy_xlsxwriter":
+            write_xlsx_rustpy(excel_file, excel_headers, columns)
+            logger.info(f"Excel file exported using rustpy-xlsxwriter: {excel_file}")
 
-                    # Write data rows
-                    for pred in all_predictions:
-                        values = [str(pred.get(h, '')) for h in headers]
-                        f.write('\t'.join(values) + '\n')
+        elif backend == "pyexcelerate":
+            write_xlsx_pyexcelerate(excel_file, excel_headers, columns)
+            logger.info(f"Excel file exported using pyexcelerate: {excel_file}")
 
-            logger.info(f"Tab-delimited Excel-compatible file created: {excel_file}")
+        elif backend == "xlsxwriter":
+            write_xlsx_constant_memory(excel_file, excel_headers, columns)
+            logger.info(f"Excel file exported using xlsxwriter: {excel_file}")
+
+        elif backend == "openpyxl":
+            write_xlsx_write_only(excel_file, excel_headers, columns)
+            logger.info(f"Excel file exported using openpyxl: {excel_file}")
+
+        elif RUSTPY_XLSXWRITER_AVAILABLE:
+            # rustpy-xlsxwriter also writes CSV/TSV, faster than the csv module
+            write_xlsx_rustpy(excel_file, headers, columns, output_format=excel_format)
+            logger.info(f"{excel_format.upper()} Excel-compatible file created: {excel_file}")
+
+        else:
+            # Create delimited format (Excel compatible)
+            with open(excel_file, 'w', newline='', buffering=1 << 20) as f:
+                writer = csv.writer(f, delimiter=DELIMITERS[excel_format], lineterminator='\n')
+                writer.writerow(headers)
+                writer.writerows(zip(*(columns[h] for h in headers)))
+
+            logger.info(f"{excel_format.upper()} Excel-compatible file created: {excel_file}")
 
         return True
 
@@ -125,6 +320,57 @@ def create_excel_compatible_output(
         logger.error(f"Excel export failed: {str(e)}")
         return False
 
+def _netmhcpan_options(config: Dict[str, Any]) -> List[str]:
+    """NetMHCpan options shared by every invocation, from config."""
+    options = []
+    if config.get("rank_threshold") is not None:
+        options.extend(["-t", str(config["rank_threshold"])])
+    # Binding affinity is only needed by callers that ask for it (-BA)
+    if not config.get("skip_ba", True):
+        options.append("-BA")
+    if config.get("sort_output"):
+        options.append("-s")
+    return options
+
+
+@lru_cache(maxsize=None)
+def _sanitize_allele(allele: str) -> str:
+    """Allele name made safe for file names (':' and '*' removed)."""
+    return allele.translate(_ALLELE_TRANS)
+
+
+def _predict_one_allele(
+    allele: str,
+    input_file: Path,
+    netmhcpan_script: Path,
+    config: Dict[str, Any],
+    logger
+) -> Optional[Dict[str, Any]]:
+    """
+    Run NetMHCpan for a single allele and parse its output.
+
+    Safe to call from worker threads: each run parses its own stdout pipe
+    and the logging module serializes handler output.
+
+    Returns:
+        Parsed results for the allele, or None if NetMHCpan failed
+    """
+    cmd = [
+        str(netmhcpan_script),
+        "-p",  # Use peptide input
+        "-a", allele,  # Specify allele
+        str(input_file)
+    ] + _netmhcpan_options(config)
+
+    success, allele_results = run_netmhcpan_streaming(
+        cmd, lambda lines: parse_netmhcpan_lines(lines, logger), logger=logger
+    )
+    if not success:
+        return None
+    allele_results.pop('per_allele', None)
+    return allele_results
+
+
 # ==============================================================================
 # Core Function (main logic extracted from use case)
 # ==============================================================================
@@ -134,6 +380,7 @@ def run_excel_export(
     excel_file: Union[str, Path],
     output_file: Optional[Union[str, Path]] = None,
     config: Optional[Dict[str, Any]] = None,
+    netmhcpan_script: Optional[Union[str, Path]] = None,
     **kwargs
 ) -> Dict[str, Any]:
     """
@@ -145,6 +392,8 @@ def run_excel_export(
         excel_file: Path to Excel output file
         output_file: Path to text output (optional, auto-generated if not provided)
         config: Configuration dict (uses DEFAULT_CONFIG if not provided)
+        netmhcpan_script: NetMHCpan executable from an earlier
+            setup_netmhcpan_env() call (set up here if not provided)
         **kwargs: Override specific config parameters
 
     Returns:
@@ -162,7 +411,7 @@ def run_excel_export(
     # Setup
     input_file = Path(input_file)
     excel_file = Path(excel_file)
-    config = {**DEFAULT_CONFIG, **(config or {}), **kwargs}
+    config = ChainMap(kwargs, config or {}, DEFAULT_CONFIG)
 
     # Parse alleles
     if isinstance(alleles, str):
@@ -179,13 +428,13 @@ def run_excel_export(
         logger.error(error_msg)
         raise FileNotFoundError(error_msg)
 
-    # Check pandas availability for Excel features
-    if not PANDAS_AVAILABLE and excel_file.suffix.lower() in ['.xlsx']:
-        logger.warning("pandas not available - Excel export will use tab-delimited format")
+    # Check writer availability for Excel features
+    if XLSX_BACKEND is None and excel_file.suffix.lower() in ['.xlsx']:
+        logger.warning("No .xlsx writer available - Excel export will use tab-delimited format")
 
     # Auto-generate text output file if not provided
     if output_file is None:
-        alleles_suffix = "_".join([a.replace(':', '').replace('*', '') for a in alleles_list[:2]])
+        alleles_suffix = "_".join(map(_sanitize_allele, alleles_list[:2]))
         output_file = input_file.parent / f"{input_file.stem}_multi_{alleles_suffix}.txt"
     else:
         output_file = Path(output_file)
@@ -196,42 +445,97 @@ def run_excel_export(
     logger.info(f"Excel output: {excel_file}")
 
     try:
-        # Setup NetMHCpan environment
-        netmhcpan_script = setup_netmhcpan_env()
+        # Setup NetMHCpan environment (unless the caller already did)
+        if netmhcpan_script is None:
+            netmhcpan_script = setup_netmhcpan_env()
 
         # Process each allele and collect results
         all_results = []
-        combined_predictions = []
+        # Combined predictions are kept column-wise; source_allele is
+        # broadcast per allele rather than copied into each prediction dict
+        combined_predictions = {key: [] for key in PREDICTION_KEYS + ('source_allele',)}
+        # (allele, strong, weak, total, success) rows for the text report
+        summary_rows = []
         success_count = 0
 
-        # Create temporary directory for individual allele results
-        temp_dir = output_file.parent / "temp_allele_results"
-        temp_dir.mkdir(exist_ok=True)
-
-        for i, allele in enumerate(alleles_list):
-            logger.info(f"Processing allele {i+1}/{len(alleles_list)}: {allele}")
-
-            # Create temporary output for this allele
-            temp_output = temp_dir / f"allele_{allele.replace(':', '_').replace('*', '_')}.txt"
-
-            # Build command for this allele
+        # Requested allele -> parsed results (None if its run failed)
+        outcomes_by_allele = {}
+        pending_alleles = alleles_list
+        if config.get("batch_alleles", True):
+            # Build a single command for all alleles; NetMHCpan loads the model
+            # once and predicts every allele in the same run
             cmd = [
                 str(netmhcpan_script),
                 "-p",  # Use peptide input
-                "-a", allele,  # Specify allele
+                "-a", ",".join(alleles_list),  # Specify all alleles
                 str(input_file)
-            ]
-
-            # Add rank threshold if specified
-            if config.get("rank_threshold") is not None:
-                cmd.extend(["-t", str(config["rank_threshold"])])
-
-            # Run prediction for this allele
-            allele_success = run_netmhcpan_command(cmd, temp_output, logger)
-
-            if allele_success:
-                # Parse results for this allele
-                allele_results = parse_netmhcpan_results(temp_output, logger)
+            ] + _netmhcpan_options(config)
+
+            logger.info(f"Processing {len(alleles_list)} alleles in a single NetMHCpan run")
+            # The raw output is only needed for the summary, so it is parsed
+            # straight from the NetMHCpan pipe instead of a temporary file
+            batch_success, parsed = run_netmhcpan_streaming(
+                cmd, lambda lines: parse_netmhcpan_lines(lines, logger), logger=logger
+            )
+
+            if batch_success:
+                per_allele = {
+                    normalize_allele_name(name): summary
+                    for name, summary in parsed.get('per_allele', {}).items()
+                }
+
+                # Split the combined output back per allele
+                for allele in alleles_list:
+                    allele_results = per_allele.get(normalize_allele_name(allele))
+                    if allele_results is not None:
+                        outcomes_by_allele[allele] = allele_results
+                pending_alleles = [a for a in alleles_list if a not in outcomes_by_allele]
+                if pending_alleles:
+                    # NetMHCpan reported these under a name that does not
+                    # match the request; run them alone rather than guess
+                    logger.warning(
+                        f"No batched output matched {', '.join(pending_alleles)} - "
+                        "re-running them one allele per run"
+                    )
+            else:
+                # Some builds reject allele lists; retry one allele per run
+                logger.warning("Batched NetMHCpan run failed - falling back to one run per allele")
+
+        if pending_alleles:
+            # Alleles are independent and each thread just waits on its
+            # NetMHCpan subprocess, so a thread pool runs them concurrently
+            max_workers = min(len(pending_alleles), os.cpu_count() or 1)
+            logger.info(f"Processing {len(pending_alleles)} alleles with {max_workers} parallel NetMHCpan runs")
+            # Every run re-reads the peptide file; stage one copy in tmpfs
+            # (Linux /dev/shm) so those reads are served from memory. The
+            # uniquely named directory is removed even if a run raises.
+            shm_dir = Path("/dev/shm")
+            stage = (
+                tempfile.TemporaryDirectory(prefix="netmhcpan_", dir=shm_dir)
+                if shm_dir.is_dir() else nullcontext()
+            )
+            with stage as stage_dir:
+                run_input = input_file
+                if stage_dir is not None:
+                    run_input = Path(stage_dir) / input_file.name
+                    shutil.copyfile(input_file, run_input)
+
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = {
+                        executor.submit(
+                            _predict_one_allele, allele, run_input,
+                            netmhcpan_script, config, logger
+                        ): allele
+                        for allele in pending_alleles
+                    }
+                    for future in as_completed(futures):
+                        outcomes_by_allele[futures[future]] = future.result()
+
+        # Restore the requested allele order
+        allele_outcomes = [outcomes_by_allele[allele] for allele in alleles_list]
+
+        for allele, allele_results in zip(alleles_list, allele_outcomes):
+            if allele_results is not None:
                 allele_results["allele"] = allele
                 all_results.append({
                     "allele": allele,
@@ -239,12 +543,22 @@ def run_excel_export(
                     "success": True
                 })
 
-                # Add to combined predictions
-                for pred in allele_results.get('predictions', []):
-                    pred_copy = pred.copy()
-                    pred_copy['source_allele'] = allele
-                    combined_predictions.append(pred_copy)
-
+                # Add to combined predictions, capped to the best-ranked
+                # top_n per allele (a heap selection, no full sort)
+                predictions = allele_results.get('predictions', [])
+                if config.get("top_n"):
+                    predictions = heapq.nsmallest(config["top_n"], predictions, key=itemgetter('rank'))
+                for key in PREDICTION_KEYS:
+                    combined_predictions[key].extend(map(itemgetter(key), predictions))
+                combined_predictions['source_allele'].extend([allele] * len(predictions))
+
+                summary_rows.append((
+                    allele,
+                    allele_results.get('strong_binders', 0),
+                    allele_results.get('weak_binders', 0),
+                    allele_results.get('total_lines', 0),
+                    True
+                ))
                 success_count += 1
                 logger.info(f"  ✓ {allele}: {allele_results.get('strong_binders', 0)} strong, {allele_results.get('weak_binders', 0)} weak binders")
             else:
@@ -254,31 +568,40 @@ def run_excel_export(
                     "results": {},
                     "success": False
                 })
+                summary_rows.append((allele, 0, 0, 0, False))
+
+        # Create combined text output, assembled in memory and written once
+        report = [
+            f"# Multi-allele NetMHCpan prediction results\n"
+            f"# Input file: {input_file}\n"
+            f"# Alleles: {', '.join(alleles_list)}\n"
+            f"# Successful predictions: {success_count}/{len(alleles_list)}\n"
+            "# \n"
+        ]
+        for allele, strong, weak, total, succeeded in summary_rows:
+            report.append(f"\n## Allele: {allele}\n")
+            if succeeded:
+                report.append(
+                    f"Strong binders: {strong}\n"
+                    f"Weak binders: {weak}\n"
+                    f"Total processed: {total}\n"
+                )
+            else:
+                report.append("FAILED\n")
 
-        # Clean up temporary files
-        import shutil
-        shutil.rmtree(temp_dir, ignore_errors=True)
-
-        # Create combined text output
         with open(output_file, 'w') as f:
-            f.write(f"# Multi-allele NetMHCpan prediction results\n")
-            f.write(f"# Input file: {input_file}\n")
-            f.write(f"# Alleles: {', '.join(alleles_list)}\n")
-            f.write(f"# Successful predictions: {success_count}/{len(alleles_list)}\n")
-            f.write("# \n")
-
-            for result in all_results:
-                f.write(f"\n## Allele: {result['allele']}\n")
-                if result['success']:
-                    res = result['results']
-                    f.write(f"Strong binders: {res.get('strong_binders', 0)}\n")
-                    f.write(f"Weak binders: {res.get('weak_binders', 0)}\n")
-                    f.write(f"Total processed: {res.get('total_lines', 0)}\n")
-                else:
-                    f.write("FAILED\n")
-
-        # Create Excel export
-        excel_success = create_excel_compatible_output(all_results, excel_file, logger)
+            f.write("".join(report))
+
+        # Create Excel export from the columns already collected above; the
+        # sheet's allele column holds the requested allele names
+        excel_columns = {
+            key: combined_predictions['source_allele' if key == 'allele' else key]
+            for key in PREDICTION_KEYS
+        }
+        excel_success = create_excel_compatible_output(
+            all_results, excel_file, logger, config.get("excel_format", "auto"),
+            columns=excel_columns
+        )
 
         # Summary
         overall_success = success_count > 0 and excel_success
@@ -296,14 +619,14 @@ def run_excel_export(
             "results": {
                 "alleles_processed": len(alleles_list),
                 "successful_alleles": success_count,
-                "total_predictions": len(combined_predictions),
+                "total_predictions": len(combined_predictions['source_allele']),
                 "per_allele_results": all_results,
                 "combined_predictions": combined_predictions
             },
             "metadata": {
                 "input_file": str(input_file),
                 "alleles": alleles_list,
-                "config": config,
+                "config": dict(config),
                 "excel_success": excel_success
             }
         }
@@ -318,7 +641,7 @@ def run_excel_export(
             "metadata": {
                 "input_file": str(input_file),
                 "alleles": alleles_list if 'alleles_list' in locals() else [],
-                "config": config,
+                "config": dict(config),
                 "error": str(e)
             }
         }
@@ -326,7 +649,8 @@ def run_excel_export(
 # ==============================================================================
 # CLI Interface
 # ==============================================================================
-def main():
+@lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description=__doc__,
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -344,8 +668,13 @@ Examples:
   # Use config file
   python scripts/excel_export.py --input test.pep --alleles HLA-A02:01 --excel-file results.xls --config configs/multi.json
 
-Note: For .xlsx files, install pandas and openpyxl: pip install pandas openpyxl
-      Otherwise, tab-delimited Excel-compatible format will be used.
+  # Comma-separated output for downstream tools
+  python scripts/excel_export.py --input test.pep --alleles HLA-A02:01,HLA-B07:02 --excel-file results.csv --format csv
+
+Note: For .xlsx files, install xlsxwriter (or openpyxl): pip install xlsxwriter
+      rustpy-xlsxwriter or pyexcelerate are used instead when installed (faster).
+      Otherwise, and for .xls/.tsv files, tab-delimited Excel-compatible format will be used;
+      .csv files are written comma-separated. --format overrides the extension.
         """
     )
 
@@ -362,17 +691,38 @@ Note: For .xlsx files, install pandas and openpyxl: pip install pandas openpyxl
     parser.add_argument(
         '--excel-file', '--excel',
         required=True,
-        help='Excel output file path (.xls or .xlsx)'
+        help='Excel output file path (.xlsx, .csv, .tsv or .xls)'
+    )
+    parser.add_argument(
+        '--format',
+        dest='excel_format',
+        choices=['auto', 'xlsx', 'csv', 'tsv'],
+        help='Export format (default: auto, chosen from the --excel-file extension)'
     )
     parser.add_argument(
         '--output', '-o',
         help='Text output file path (auto-generated if not specified)'
     )
+    parser.add_argument(
+        '--per-allele',
+        action='store_true',
+        help='Run one NetMHCpan process per allele (in parallel) instead of a single batched run'
+    )
     parser.add_argument(
         '--rank-threshold', '-t',
         type=float,
         help='Rank threshold for output filtering (e.g., 2.0 for ≤2%% rank)'
     )
+    parser.add_argument(
+        '--top-n',
+        type=int,
+        help='Export only the N best-ranked predictions per allele'
+    )
+    parser.add_argument(
+        '--with-ba',
+        action='store_true',
+        help='Also run binding affinity prediction (-BA); slower, not used by the summary'
+    )
     parser.add_argument(
         '--config', '-c',
         help='Config file (JSON)'
@@ -384,23 +734,32 @@ Note: For .xlsx files, install pandas and openpyxl: pip install pandas openpyxl
         help='Logging level'
     )
 
-    args = parser.parse_args()
+    return parser
+
+
+def main():
+    args = _build_parser().parse_args()
 
-    # Check pandas availability and warn user
-    if not PANDAS_AVAILABLE:
-        print("⚠️  Warning: pandas not available. Install with 'pip install pandas openpyxl' for full Excel support.")
+    # Check writer availability and warn user
+    if XLSX_BACKEND is None:
+        print("⚠️  Warning: xlsxwriter not available. Install with 'pip install xlsxwriter' for full Excel support.")
         print("   Tab-delimited Excel-compatible format will be used instead.")
 
     # Load config if provided
-    config = None
-    if args.config:
-        with open(args.config) as f:
-            config = json.load(f)
+    config = load_config(args.config) if args.config else None
 
     # Override config with command line arguments
     cli_overrides = {}
+    if args.per_allele:
+        cli_overrides["batch_alleles"] = False
+    if args.excel_format is not None:
+        cli_overrides["excel_format"] = args.excel_format
     if args.rank_threshold is not None:
         cli_overrides["rank_threshold"] = args.rank_threshold
+    if args.with_ba:
+        cli_overrides["skip_ba"] = False
+    if args.top_n is not None:
+        cli_overrides["top_n"] = args.top_n
     if args.log_level != DEFAULT_CONFIG["log_level"]:
         cli_overrides["log_level"] = args.log_level
 
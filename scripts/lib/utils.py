@@ -6,10 +6,44 @@ to minimize dependencies and provide reusable functionality.
 """
 
 import os
+import re
+import shlex
+import stat
 import subprocess
 import logging
+import tempfile
+from array import array
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from typing import Union, Optional, Dict, Any, Tuple
+from typing import Union, Optional, Dict, Any, Tuple, Callable, Iterable, Iterator
+
+# Optional orjson import for faster config parsing
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    import json
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+# NetMHCpan result row: captures the MHC (1), peptide (2), score (6) and
+# %Rank (9) columns of rows with at least 11 whitespace-separated fields.
+# Leading whitespace is allowed so raw (unstripped) lines can be matched.
+_RESULT_ROW_RE = re.compile(
+    r"\s*\S+\s+(\S+)\s+(\S+)(?:\s+\S+){3}\s+(\S+)(?:\s+\S+){2}\s+(\S+)\s+\S"
+)
+
+# %Rank thresholds for binder classification
+STRONG_BINDER_RANK = 0.5
+WEAK_BINDER_RANK = 2.0
+
+# Parsed NetMHCpan output: (total_lines, per-allele (allele, total, ranks)
+# tuples, prediction (peptide, allele, score, rank) tuples)
+_ParsedOutput = Tuple[int, Tuple[Tuple[str, int, array], ...], Tuple[Tuple[str, str, float, float], ...]]
+
+# Loggers already returned by setup_logger, keyed by (name, level)
+_LOGGER_CACHE: Dict[Tuple[str, str], logging.Logger] = {}
 
 
 def setup_logger(name: str = "netmhcpan", level: str = "INFO") -> logging.Logger:
@@ -23,6 +57,10 @@ def setup_logger(name: str = "netmhcpan", level: str = "INFO") -> logging.Logger
     Returns:
         Configured logger instance
     """
+    logger = _LOGGER_CACHE.get((name, level))
+    if logger is not None:
+        return logger
+
     logger = logging.getLogger(name)
     if not logger.handlers:  # Avoid duplicate handlers
         handler = logging.StreamHandler()
@@ -33,13 +71,35 @@ def setup_logger(name: str = "netmhcpan", level: str = "INFO") -> logging.Logger
         handler.setFormatter(formatter)
         logger.addHandler(handler)
         logger.setLevel(getattr(logging, level.upper()))
+    _LOGGER_CACHE[(name, level)] = logger
     return logger
 
 
-def setup_netmhcpan_env(mcp_root: Optional[Path] = None) -> Path:
+@lru_cache(maxsize=4)
+def _find_netmhcpan_script(mcp_root: Path) -> Path:
+    """Locate the netMHCpan script under a normalized MCP root (cached)."""
+    netmhcpan_dir = mcp_root / "repo" / "netMHCpan-4.2"
+
+    if not netmhcpan_dir.exists():
+        raise FileNotFoundError(f"NetMHCpan directory not found: {netmhcpan_dir}")
+
+    netmhcpan_script = netmhcpan_dir / "netMHCpan"
+    if not netmhcpan_script.exists():
+        raise FileNotFoundError(f"NetMHCpan script not found: {netmhcpan_script}")
+
+    return netmhcpan_script
+
+
+def setup_netmhcpan_env(mcp_root: Optional[Union[str, Path]] = None) -> Path:
     """
     Setup NetMHCpan environment variables and paths.
 
+    Path discovery is cached per MCP root (None, str and Path spellings of
+    the same root share one entry), so repeated calls skip the filesystem
+    checks. Failures are not cached and are retried on the next call. The
+    environment variables are set on every call, so switching between roots
+    always leaves NMHOME pointing at the root that was asked for.
+
     Args:
         mcp_root: Root directory of MCP project (auto-detected if None)
 
@@ -51,24 +111,29 @@ def setup_netmhcpan_env(mcp_root: Optional[Path] = None) -> Path:
     """
     if mcp_root is None:
         # Auto-detect MCP root from script location
-        mcp_root = Path(__file__).parent.parent.parent.absolute()
-
-    netmhcpan_dir = mcp_root / "repo" / "netMHCpan-4.2"
-
-    if not netmhcpan_dir.exists():
-        raise FileNotFoundError(f"NetMHCpan directory not found: {netmhcpan_dir}")
-
-    netmhcpan_script = netmhcpan_dir / "netMHCpan"
-    if not netmhcpan_script.exists():
-        raise FileNotFoundError(f"NetMHCpan script not found: {netmhcpan_script}")
+        mcp_root = Path(__file__).parent.parent.parent
+    netmhcpan_script = _find_netmhcpan_script(Path(mcp_root).absolute())
 
     # Set environment variables
-    os.environ['NMHOME'] = str(netmhcpan_dir)
+    os.environ['NMHOME'] = str(netmhcpan_script.parent)
     os.environ['TMPDIR'] = '/tmp'
 
     return netmhcpan_script
 
 
+def format_command(cmd: Iterable[Union[str, Path]]) -> str:
+    """
+    Render a command list (as stored in result metadata) as a shell string.
+
+    Args:
+        cmd: Command arguments
+
+    Returns:
+        Shell-quoted command line
+    """
+    return shlex.join(map(str, cmd))
+
+
 def run_netmhcpan_command(
     cmd: list,
     output_file: Union[str, Path],
@@ -117,100 +182,447 @@ def run_netmhcpan_command(
         return False
 
 
+def _tee_lines(lines: Iterable[bytes], out_fh) -> Iterator[bytes]:
+    """Yield lines unchanged while writing each one to out_fh."""
+    for line in lines:
+        out_fh.write(line)
+        yield line
+
+
+def run_netmhcpan_streaming(
+    cmd: list,
+    parse: Callable[[Iterable[bytes]], Any],
+    output_file: Optional[Union[str, Path]] = None,
+    logger: Optional[logging.Logger] = None
+) -> Tuple[bool, Any]:
+    """
+    Run a NetMHCpan command and parse its output straight from the pipe.
+
+    Unlike run_netmhcpan_command, the output is not written to disk and read
+    back: stdout is handed to the parser as it is produced. If output_file is
+    given, the raw output is also written there on the way through.
+
+    Args:
+        cmd: Command list to execute
+        parse: Callable consuming an iterable of raw output lines (bytes)
+        output_file: Optional file to also save the raw output to
+        logger: Logger instance (creates new one if None)
+
+    Returns:
+        Tuple of (success, parse result); the parse result is None on failure
+    """
+    if logger is None:
+        logger = setup_logger()
+
+    logger.info(f"Running NetMHCpan with command: {' '.join(map(str, cmd))}")
+    if output_file is not None:
+        logger.info(f"Output will be saved to: {output_file}")
+
+    out_fh = None
+    try:
+        if output_file is not None:
+            Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+            out_fh = open(output_file, 'wb')
+
+        # stderr goes to a temporary file so a chatty stderr cannot fill its
+        # pipe and block the process while stdout is being consumed
+        with tempfile.TemporaryFile() as stderr_fh:
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=stderr_fh,
+                bufsize=1 << 20
+            )
+            try:
+                lines = proc.stdout if out_fh is None else _tee_lines(proc.stdout, out_fh)
+                parsed = parse(lines)
+                # Drain anything the parser did not consume
+                for line in lines:
+                    pass
+            finally:
+                proc.stdout.close()
+                returncode = proc.wait()
+
+            if returncode != 0:
+                stderr_fh.seek(0)
+                stderr = stderr_fh.read().decode(errors='replace')
+                logger.error(f"NetMHCpan failed with error: {stderr}")
+                return False, None
+
+        logger.info(f"Prediction completed successfully!")
+        if output_file is not None:
+            logger.info(f"Results saved to: {output_file}")
+        return True, parsed
+
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return False, None
+    finally:
+        if out_fh is not None:
+            out_fh.close()
+
+
+class StreamingParser:
+    """
+    Incremental NetMHCpan output parser.
+
+    Lines are fed one at a time as NetMHCpan produces them, so output never
+    has to be written to disk and read back to be summarized.
+
+    Example:
+        >>> parser = StreamingParser(logger)
+        >>> for line in proc.stdout:
+        ...     parser.feed(line)
+        >>> results = parser.finalize()
+    """
+
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        collect_predictions: bool = True
+    ):
+        self.logger = logger
+        self.collect_predictions = collect_predictions
+        self.results_started = False
+        self.total_lines = 0
+        self.predictions = []
+        self.allele_totals = {}
+        self.ranks_by_allele = {}
+        self._allele_names = {}  # raw MHC field (bytes) -> decoded name
+
+    def feed(self, line: Union[str, bytes]) -> None:
+        """Parse one output line (text, or raw bytes from a pipe)."""
+        if isinstance(line, bytes):
+            self.feed_binary((line,))
+            return
+
+        # Dispatch on the first character; only '-' lines need a full check
+        prefix = line[:1]
+
+        # Skip comment lines
+        if prefix == '#':
+            return
+
+        # Look for the separator line that indicates results start
+        if prefix == '-' and line.startswith("-----"):
+            self.results_started = True
+            return
+
+        # Process result lines (blank lines simply do not match)
+        if not self.results_started:
+            return
+        match = _RESULT_ROW_RE.match(line)
+        if match:  # Standard NetMHCpan output has 11+ columns
+            self._add_row(*match.groups())
+
+    def feed_binary(self, lines: Iterable[bytes]) -> None:
+        """
+        Parse raw output lines (bytes) in one tight loop.
+
+        Same result as feeding each line, without decoding whole lines or a
+        regex match per line: rows are split on whitespace (as bytes) and
+        only the MHC and peptide fields are decoded.
+        """
+        lines = iter(lines)
+        if not self.results_started:
+            # Results start after the first separator line
+            for line in lines:
+                if line[:5] == b'-----':
+                    self.results_started = True
+                    break
+            else:
+                return
+
+        allele_names = self._allele_names
+        add_row = self._add_row
+        for line in lines:
+            # Skip comment lines
+            if line[:1] == b'#':
+                continue
+            # Standard NetMHCpan output has 11+ columns; only the first 10
+            # are used, so split at most 10 times
+            fields = line.split(None, 10)
+            if len(fields) < 11:
+                continue
+            allele = allele_names.get(fields[1])
+            if allele is None:
+                allele = allele_names[fields[1]] = fields[1].decode('utf-8', errors='replace')
+            # float() accepts the bytes score and %Rank fields directly
+            add_row(allele, fields[2].decode('utf-8', errors='replace'), fields[6], fields[9])
+
+    def _add_row(self, allele: str, peptide: str, score, rank) -> None:
+        """Record one result row; score and rank may be str or bytes."""
+        # Both columns are parsed before anything is counted, so a
+        # malformed line leaves no trace in the totals
+        try:
+            rank = float(rank)  # %Rank column
+            if self.collect_predictions:
+                score = float(score)
+        except ValueError:
+            # Skip malformed lines
+            return
+
+        self.total_lines += 1
+        allele_ranks = self.ranks_by_allele.get(allele)
+        if allele_ranks is None:
+            allele_ranks = self.ranks_by_allele[allele] = array('d')
+            self.allele_totals[allele] = 0
+        self.allele_totals[allele] += 1
+
+        # Classified in bulk when the result is built
+        allele_ranks.append(rank)
+
+        # Store prediction details (optional)
+        if self.collect_predictions:
+            self.predictions.append((peptide, allele, score, rank))
+
+    def summary(self) -> _ParsedOutput:
+        """
+        Summary of the lines fed so far.
+
+        Binders are not classified here, so one summary can be classified
+        against any weak-binder threshold (see _build_parse_result).
+
+        Returns:
+            (total_lines, per-allele (allele, total, %Rank array) tuples,
+            prediction (peptide, allele, score, rank) tuples in output order)
+        """
+        allele_ranks = tuple(
+            (allele, self.allele_totals[allele], ranks)
+            for allele, ranks in self.ranks_by_allele.items()
+        )
+        return self.total_lines, allele_ranks, tuple(self.predictions)
+
+    def finalize(self, rank_threshold: float = WEAK_BINDER_RANK) -> Dict[str, Any]:
+        """Return the summary dict (see parse_netmhcpan_results) and log it."""
+        return _build_parse_result(self.summary(), self.logger or setup_logger(), rank_threshold)
+
+
+def _parse_result_lines(
+    lines: Iterable[Union[str, bytes]],
+    collect_predictions: bool = True
+) -> _ParsedOutput:
+    """Feed all lines through a StreamingParser and return its summary()."""
+    parser = StreamingParser(collect_predictions=collect_predictions)
+    feed = parser.feed
+    for line in lines:
+        feed(line)
+    return parser.summary()
+
+
+def _parse_results_file(output_file: str, collect_predictions: bool = True) -> _ParsedOutput:
+    """
+    Parse a NetMHCpan output file and return its StreamingParser summary().
+
+    The file is read in binary mode (see StreamingParser.feed_binary).
+    """
+    parser = StreamingParser(collect_predictions=collect_predictions)
+    with open(output_file, 'rb') as f:
+        parser.feed_binary(f)
+    return parser.summary()
+
+
+@lru_cache(maxsize=64)
+def _parse_results_file_cached(output_file: str, mtime_ns: int, size: int) -> _ParsedOutput:
+    """
+    Counts and %Rank arrays of a NetMHCpan output file, memoized on its
+    path, mtime and size.
+
+    Reached only through parse_netmhcpan_results(collect_predictions=False).
+    Prediction rows are never collected here, so an entry stays small
+    however large the output is. mtime_ns and size are only part of the
+    cache key: a rewritten file gets a new key and is parsed again.
+    """
+    return _parse_results_file(output_file, collect_predictions=False)
+
+
+def _build_parse_result(
+    parsed: _ParsedOutput,
+    logger: logging.Logger,
+    rank_threshold: float = WEAK_BINDER_RANK
+) -> Dict[str, Any]:
+    """
+    Build (and log) the parse result dicts from _parse_result_lines output.
+
+    Binders are classified here, in C-level loops over the per-allele %Rank
+    arrays: strong at ≤0.5% rank, weak above that up to rank_threshold.
+    """
+    total_lines, allele_ranks, rows = parsed
+    binder_rank = float(max(rank_threshold, STRONG_BINDER_RANK))
+
+    per_allele = {}
+    for allele, total, ranks in allele_ranks:
+        strong = sum(map(STRONG_BINDER_RANK.__ge__, ranks))
+        per_allele[allele] = {
+            'strong_binders': strong,
+            'weak_binders': sum(map(binder_rank.__ge__, ranks)) - strong,
+            'total_lines': total,
+            'predictions': []
+        }
+
+    # Prediction dicts are shared between the global and per-allele lists
+    predictions = []
+    for peptide, allele, score, rank in rows:
+        prediction = {
+            'peptide': peptide,
+            'allele': allele,
+            'score': score,
+            'rank': rank
+        }
+        predictions.append(prediction)
+        per_allele[allele]['predictions'].append(prediction)
+
+    strong_binders = sum(summary['strong_binders'] for summary in per_allele.values())
+    weak_binders = sum(summary['weak_binders'] for summary in per_allele.values())
+
+    logger.info("=== Prediction Summary ===")
+    logger.info(f"Strong binders (≤0.5% rank): {strong_binders}")
+    logger.info(f"Weak binders (≤{rank_threshold}% rank): {weak_binders}")
+    logger.info(f"Total lines processed: {total_lines}")
+
+    return {
+        'strong_binders': strong_binders,
+        'weak_binders': weak_binders,
+        'total_lines': total_lines,
+        'predictions': predictions,
+        'per_allele': per_allele
+    }
+
+
+def _empty_parse_result() -> Dict[str, Any]:
+    """Parse result returned when output could not be parsed."""
+    return {
+        'strong_binders': 0,
+        'weak_binders': 0,
+        'total_lines': 0,
+        'predictions': [],
+        'per_allele': {}
+    }
+
+
 def parse_netmhcpan_results(
     output_file: Union[str, Path],
-    logger: Optional[logging.Logger] = None
+    logger: Optional[logging.Logger] = None,
+    collect_predictions: bool = True,
+    rank_threshold: float = WEAK_BINDER_RANK
 ) -> Dict[str, Any]:
     """
     Parse NetMHCpan output and return summary statistics.
 
+    The file is read line by line, so memory use does not grow with the size
+    of the output unless predictions are collected. With collect_predictions
+    the file is read on every call. Without it (as in the server's
+    analyze_netmhcpan_output(include_predictions=False)) only the counts
+    and %Rank values are needed, and those are cached by (path, mtime,
+    size): re-parsing an unchanged file, also with a different
+    rank_threshold, only re-classifies the cached values. Every call returns
+    freshly built dicts that the caller may modify.
+
     Args:
         output_file: Path to NetMHCpan output file
         logger: Logger instance (creates new one if None)
+        collect_predictions: Build the 'predictions' lists; when False only
+            the counts are computed and the lists stay empty
+        rank_threshold: Upper %Rank bound for weak binders (default: 2.0)
 
     Returns:
         Dictionary with parsing results:
         {
             'strong_binders': int,  # count with ≤0.5% rank
-            'weak_binders': int,    # count with ≤2.0% rank
+            'weak_binders': int,    # count with ≤rank_threshold% rank
             'total_lines': int,     # total result lines processed
-            'predictions': list     # list of prediction dicts (optional)
+            'predictions': list,    # list of prediction dicts (optional)
+            'per_allele': dict      # same summary split by the MHC column
         }
     """
     if logger is None:
         logger = setup_logger()
 
     try:
-        with open(output_file, 'r') as f:
-            lines = f.readlines()
+        if collect_predictions:
+            # Rows are as large as the output itself, so they are not memoized
+            parsed = _parse_results_file(os.fspath(output_file))
+        else:
+            st = os.stat(output_file)
+            parsed = _parse_results_file_cached(
+                os.fspath(output_file), st.st_mtime_ns, st.st_size
+            )
+        return _build_parse_result(parsed, logger, rank_threshold)
 
-        # Find results section (after the header)
-        results_started = False
-        strong_binders = 0
-        weak_binders = 0
-        total_lines = 0
-        predictions = []
+    except Exception as e:
+        logger.warning(f"Could not parse results: {str(e)}")
+        return _empty_parse_result()
 
-        for line in lines:
-            line = line.strip()
 
-            # Skip comment lines
-            if line.startswith('#'):
-                continue
+def parse_netmhcpan_lines(
+    lines: Iterable[Union[str, bytes]],
+    logger: Optional[logging.Logger] = None,
+    collect_predictions: bool = True
+) -> Dict[str, Any]:
+    """
+    Parse NetMHCpan output lines, e.g. straight from run_netmhcpan_streaming.
 
-            # Look for the separator line that indicates results start
-            if line.startswith("-----"):
-                results_started = True
-                continue
+    Same result as parse_netmhcpan_results, without an output file.
 
-            # Process result lines
-            if results_started and line:
-                parts = line.split()
-                if len(parts) >= 11:  # Standard NetMHCpan output has 11+ columns
-                    try:
-                        total_lines += 1
-                        rank = float(parts[9])  # %Rank column (0-based index)
-
-                        # Classification based on rank
-                        if rank <= 0.5:
-                            strong_binders += 1
-                        elif rank <= 2.0:
-                            weak_binders += 1
-
-                        # Store prediction details (optional)
-                        if len(parts) >= 11:
-                            predictions.append({
-                                'peptide': parts[2] if len(parts) > 2 else '',
-                                'allele': parts[1] if len(parts) > 1 else '',
-                                'score': float(parts[6]) if len(parts) > 6 else 0.0,
-                                'rank': rank
-                            })
-                    except (ValueError, IndexError):
-                        # Skip malformed lines
-                        continue
-
-        result = {
-            'strong_binders': strong_binders,
-            'weak_binders': weak_binders,
-            'total_lines': total_lines,
-            'predictions': predictions
-        }
+    Args:
+        lines: Output lines, as text or as raw bytes from a pipe
+        logger: Logger instance (creates new one if None)
+        collect_predictions: Build the 'predictions' lists
 
-        logger.info("=== Prediction Summary ===")
-        logger.info(f"Strong binders (≤0.5% rank): {strong_binders}")
-        logger.info(f"Weak binders (≤2.0% rank): {weak_binders}")
-        logger.info(f"Total lines processed: {total_lines}")
+    Returns:
+        Dictionary with parsing results (see parse_netmhcpan_results)
+    """
+    if logger is None:
+        logger = setup_logger()
 
-        return result
+    try:
+        parser = StreamingParser(logger, collect_predictions)
+        lines = iter(lines)
+        first = next(lines, None)
+        if isinstance(first, bytes):
+            # Raw pipe output takes the binary fast path
+            parser.feed_binary(chain((first,), lines))
+        elif first is not None:
+            feed = parser.feed
+            feed(first)
+            for line in lines:
+                feed(line)
+        return parser.finalize()
 
     except Exception as e:
         logger.warning(f"Could not parse results: {str(e)}")
-        return {
-            'strong_binders': 0,
-            'weak_binders': 0,
-            'total_lines': 0,
-            'predictions': []
-        }
+        return _empty_parse_result()
+
+
+def normalize_allele_name(allele: str) -> str:
+    """
+    Normalize an HLA allele name for comparison.
+
+    NetMHCpan reports alleles as "HLA-A*02:01" while they are requested as
+    "HLA-A02:01"; both normalize to the latter form.
+
+    Args:
+        allele: Allele name as requested or as reported by NetMHCpan
+
+    Returns:
+        Allele name without the '*' separator
+    """
+    return allele.strip().replace('*', '')
+
+
+def load_config(config_file: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Load a JSON config file, using orjson when it is installed.
+
+    Args:
+        config_file: Path to JSON config file
+
+    Returns:
+        Parsed configuration dictionary
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(Path(config_file).read_bytes())
+    return json.loads(Path(config_file).read_text())
 
 
 def validate_input_file(file_path: Union[str, Path]) -> bool:
@@ -223,8 +635,64 @@ def validate_input_file(file_path: Union[str, Path]) -> bool:
     Returns:
         True if file is valid, False otherwise
     """
-    file_path = Path(file_path)
-    return file_path.exists() and file_path.is_file()
+    # is_file() is a single stat and is already False for missing paths
+    return Path(file_path).is_file()
+
+
+def detect_input_type(file_path: Union[str, Path], peek_bytes: int = 4096) -> str:
+    """
+    Guess whether an input file is FASTA or a plain peptide list.
+
+    Only the first peek_bytes are read. A file is a peptide list when it has
+    no '>' header lines and every line starts with a short (≤14 residue)
+    alphabetic token; anything else is treated as FASTA.
+
+    Args:
+        file_path: Path to input file
+        peek_bytes: Number of bytes to inspect
+
+    Returns:
+        "peptide" or "fasta"
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(peek_bytes)
+
+    lines = head.splitlines()
+    if len(head) == peek_bytes and lines:
+        lines.pop()  # last line may be cut off mid-token
+
+    tokens = [line.split(None, 1)[0] for line in lines if line.strip()]
+    if not tokens:
+        return "fasta"
+    for token in tokens:
+        if token.startswith(b'>') or len(token) > 14 or not token.isalpha():
+            return "fasta"
+    return "peptide"
+
+
+def stat_input_file(file_path: Union[str, Path]) -> os.stat_result:
+    """
+    Stat an input file once, for callers that also need its size or mtime.
+
+    Results are deliberately not cached: a cached stat would hide a file that
+    was replaced or removed between calls.
+
+    Args:
+        file_path: Path to input file
+
+    Returns:
+        os.stat_result for the file
+
+    Raises:
+        FileNotFoundError: If the path does not exist or is not a regular file
+    """
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
+        raise FileNotFoundError(f"Input file not found or not readable: {file_path}")
+    return st
 
 
 def get_mcp_paths(script_path: Optional[Path] = None) -> Dict[str, Path]:
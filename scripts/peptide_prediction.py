@@ -17,17 +17,29 @@ Example:
 # Minimal Imports (only essential packages)
 # ==============================================================================
 import argparse
-import json
+import hashlib
+import os
+import shutil
 import sys
+import tempfile
+from collections import ChainMap
+from functools import lru_cache
 from pathlib import Path
 from typing import Union, Optional, Dict, Any
 
-# Local imports
-sys.path.insert(0, str(Path(__file__).parent))
-from lib.utils import (
-    setup_logger, setup_netmhcpan_env, run_netmhcpan_command,
-    parse_netmhcpan_results, validate_input_file, get_mcp_paths
-)
+# Local imports: a package import when loaded as part of the scripts package
+# (e.g. by the MCP server); run directly, the script's own directory is used
+try:
+    from .lib.utils import (
+        setup_logger, setup_netmhcpan_env, run_netmhcpan_command,
+        parse_netmhcpan_results, validate_input_file, get_mcp_paths, load_config
+    )
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent))
+    from lib.utils import (
+        setup_logger, setup_netmhcpan_env, run_netmhcpan_command,
+        parse_netmhcpan_results, validate_input_file, get_mcp_paths, load_config
+    )
 
 # ==============================================================================
 # Configuration (extracted from use case)
@@ -35,10 +47,63 @@ from lib.utils import (
 DEFAULT_CONFIG = {
     "allele": "HLA-A02:01",
     "rank_threshold": None,
+    "skip_ba": True,  # NetMHCpan default (EL only); False adds -BA, which is slower
+    "sort_output": False,  # True adds -s (sort rows by score)
+    "cache_dir": None,  # directory for reusing NetMHCpan output across runs (None = off)
     "output_format": "text",
     "log_level": "INFO"
 }
 
+# ==============================================================================
+# Output Cache
+# ==============================================================================
+def output_cache_key(input_file: Path, cmd: list) -> str:
+    """
+    Content-addressed key for a NetMHCpan run: sha256 of the input file
+    contents and the command arguments other than the input path.
+
+    The path is left out, so the same peptides under another file name
+    (or a re-written but unchanged file) share one cache entry.
+
+    Args:
+        input_file: Peptide input file
+        cmd: NetMHCpan command list
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(input_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    input_arg = str(input_file)
+    for arg in cmd:
+        if arg != input_arg:
+            digest.update(b'\0' + str(arg).encode())
+    return digest.hexdigest()
+
+
+def _run_into_cache(cmd: list, cache_file: Path, logger) -> bool:
+    """
+    Run NetMHCpan into a private temp file in the cache directory and rename
+    it to cache_file once the run succeeded.
+
+    Only this call writes the temp file, so an entry always holds the output
+    of its own command, however many runs share an output_file. Entries are
+    never evicted: the cache grows until cache_dir is cleared by hand.
+    """
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=cache_file.parent, prefix=f"{cache_file.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        success = run_netmhcpan_command(cmd, tmp_name, logger)
+        if success:
+            os.replace(tmp_name, cache_file)
+        return success
+    finally:
+        Path(tmp_name).unlink(missing_ok=True)
+
+
 # ==============================================================================
 # Core Function (main logic extracted from use case)
 # ==============================================================================
@@ -46,6 +111,7 @@ def run_peptide_prediction(
     input_file: Union[str, Path],
     output_file: Optional[Union[str, Path]] = None,
     config: Optional[Dict[str, Any]] = None,
+    netmhcpan_script: Optional[Union[str, Path]] = None,
     **kwargs
 ) -> Dict[str, Any]:
     """
@@ -55,6 +121,8 @@ def run_peptide_prediction(
         input_file: Path to input peptide file
         output_file: Path to save output (optional, auto-generated if not provided)
         config: Configuration dict (uses DEFAULT_CONFIG if not provided)
+        netmhcpan_script: NetMHCpan executable from an earlier
+            setup_netmhcpan_env() call (set up here if not provided)
         **kwargs: Override specific config parameters
 
     Returns:
@@ -70,7 +138,7 @@ def run_peptide_prediction(
     """
     # Setup
     input_file = Path(input_file)
-    config = {**DEFAULT_CONFIG, **(config or {}), **kwargs}
+    config = ChainMap(kwargs, config or {}, DEFAULT_CONFIG)
 
     # Setup logger
     logger = setup_logger("peptide_prediction", config.get("log_level", "INFO"))
@@ -92,8 +160,9 @@ def run_peptide_prediction(
     logger.info(f"Output: {output_file}")
 
     try:
-        # Setup NetMHCpan environment
-        netmhcpan_script = setup_netmhcpan_env()
+        # Setup NetMHCpan environment (unless the caller already did)
+        if netmhcpan_script is None:
+            netmhcpan_script = setup_netmhcpan_env()
 
         # Build command
         cmd = [
@@ -107,13 +176,49 @@ def run_peptide_prediction(
         if config.get("rank_threshold") is not None:
             cmd.extend(["-t", str(config["rank_threshold"])])
 
-        # Run prediction
-        success = run_netmhcpan_command(cmd, output_file, logger)
+        # Binding affinity is only computed when asked for (-BA)
+        if not config.get("skip_ba", True):
+            cmd.append("-BA")
+        if config.get("sort_output"):
+            cmd.append("-s")
+
+        # Reuse the output of an identical earlier run if caching is enabled
+        # (cache problems are logged and the run goes ahead without it)
+        cache_file = None
+        cached = False
+        if config.get("cache_dir"):
+            try:
+                cache_file = Path(config["cache_dir"]) / f"{output_cache_key(input_file, cmd)}.txt"
+                cached = cache_file.is_file()
+            except OSError as e:
+                logger.warning(f"Output cache lookup failed, running without cache: {e}")
+                cache_file = None
+
+        success = cached
+        if cache_file is not None and not cached:
+            try:
+                success = _run_into_cache(cmd, cache_file, logger)
+            except OSError as e:
+                logger.warning(f"Output cache unavailable, running without cache: {e}")
+                cache_file = None
+
+        results_file = output_file
+        if cache_file is None:
+            # Run prediction
+            success = run_netmhcpan_command(cmd, output_file, logger)
+        elif success:
+            # The entry holds exactly this command's output, so it is what
+            # gets parsed; output_file only receives a copy of it
+            if cached:
+                logger.info(f"Reusing cached NetMHCpan output: {cache_file}")
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(cache_file, output_file)
+            results_file = cache_file
 
         # Parse results
         results = {}
         if success:
-            results = parse_netmhcpan_results(output_file, logger)
+            results = parse_netmhcpan_results(results_file, logger)
             logger.info(f"Prediction completed successfully!")
         else:
             logger.error("Prediction failed")
@@ -124,8 +229,9 @@ def run_peptide_prediction(
             "results": results,
             "metadata": {
                 "input_file": str(input_file),
-                "config": config,
-                "command": " ".join(cmd)
+                "config": dict(config),
+                "command": cmd,
+                "cached": cached
             }
         }
 
@@ -137,7 +243,7 @@ def run_peptide_prediction(
             "results": {},
             "metadata": {
                 "input_file": str(input_file),
-                "config": config,
+                "config": dict(config),
                 "error": str(e)
             }
         }
@@ -145,7 +251,8 @@ def run_peptide_prediction(
 # ==============================================================================
 # CLI Interface
 # ==============================================================================
-def main():
+@lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description=__doc__,
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -160,6 +267,9 @@ Examples:
   # Filter results by rank threshold
   python scripts/peptide_prediction.py --input test.pep --rank-threshold 2.0
 
+  # Reuse outputs of identical earlier runs
+  python scripts/peptide_prediction.py --input test.pep --cache-dir .peptide_cache
+
   # Use custom config file
   python scripts/peptide_prediction.py --input test.pep --config configs/custom.json
         """
@@ -184,6 +294,15 @@ Examples:
         type=float,
         help='Rank threshold for output filtering (e.g., 2.0 for ≤2%% rank)'
     )
+    parser.add_argument(
+        '--with-ba',
+        action='store_true',
+        help='Also run binding affinity prediction (-BA); slower, not used by the summary'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help='Reuse NetMHCpan output of identical earlier runs (same input contents and options) stored here; never pruned, clear it by hand'
+    )
     parser.add_argument(
         '--config', '-c',
         help='Config file (JSON)'
@@ -195,13 +314,14 @@ Examples:
         help='Logging level'
     )
 
-    args = parser.parse_args()
+    return parser
+
+
+def main():
+    args = _build_parser().parse_args()
 
     # Load config if provided
-    config = None
-    if args.config:
-        with open(args.config) as f:
-            config = json.load(f)
+    config = load_config(args.config) if args.config else None
 
     # Override config with command line arguments
     cli_overrides = {}
@@ -209,6 +329,10 @@ Examples:
         cli_overrides["allele"] = args.allele
     if args.rank_threshold is not None:
         cli_overrides["rank_threshold"] = args.rank_threshold
+    if args.with_ba:
+        cli_overrides["skip_ba"] = False
+    if args.cache_dir:
+        cli_overrides["cache_dir"] = args.cache_dir
     if args.log_level != DEFAULT_CONFIG["log_level"]:
         cli_overrides["log_level"] = args.log_level
 
@@ -17,17 +17,29 @@ Example:
 # Minimal Imports (only essential packages)
 # ==============================================================================
 import argparse
-import json
+import os
 import sys
+import tempfile
+from collections import ChainMap
+from functools import lru_cache
 from pathlib import Path
 from typing import Union, Optional, Dict, Any, List
 
-# Local imports
-sys.path.insert(0, str(Path(__file__).parent))
-from lib.utils import (
-    setup_logger, setup_netmhcpan_env, run_netmhcpan_command,
-    parse_netmhcpan_results, validate_input_file, get_mcp_paths
-)
+# Local imports: a package import when loaded as part of the scripts package
+# (e.g. by the MCP server); run directly, the script's own directory is used
+try:
+    from .lib.utils import (
+        setup_logger, setup_netmhcpan_env, run_netmhcpan_streaming,
+        parse_netmhcpan_lines, stat_input_file, get_mcp_paths,
+        detect_input_type, load_config
+    )
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent))
+    from lib.utils import (
+        setup_logger, setup_netmhcpan_env, run_netmhcpan_streaming,
+        parse_netmhcpan_lines, stat_input_file, get_mcp_paths,
+        detect_input_type, load_config
+    )
 
 # ==============================================================================
 # Configuration (extracted from use case)
@@ -37,28 +49,70 @@ DEFAULT_CONFIG = {
     "peptide_length": "9",
     "rank_threshold": None,
     "sort_output": False,
+    "input_type": "auto",  # "auto", "fasta" or "peptide" (one peptide per line, run with -p)
     "output_format": "text",
     "log_level": "INFO"
 }
 
+# ==============================================================================
+# Input Merging
+# ==============================================================================
+def merge_input_files(input_files: List[Path], merged_file: Path) -> Dict[str, List[str]]:
+    """
+    Concatenate several input files into one, for a single NetMHCpan run.
+
+    Files are copied as-is, in order; a newline is added after any file that
+    does not end with one, so records never run together.
+
+    Args:
+        input_files: FASTA (or peptide list) files to merge
+        merged_file: Path to write the merged file to
+
+    Returns:
+        Provenance: mapping of each source file to the IDs (first header
+        word) of the FASTA records it contributed, in order
+    """
+    provenance = {}
+    with open(merged_file, 'wb') as out:
+        for path in input_files:
+            record_ids = []
+            line = b'\n'
+            with open(path, 'rb') as f:
+                for line in f:
+                    if line[:1] == b'>':
+                        header = line[1:].split(None, 1)
+                        record_ids.append(header[0].decode('utf-8', errors='replace') if header else '')
+                    out.write(line)
+            if not line.endswith(b'\n'):
+                out.write(b'\n')
+            provenance[os.fspath(path)] = record_ids
+    return provenance
+
+
 # ==============================================================================
 # Core Function (main logic extracted from use case)
 # ==============================================================================
 def run_protein_prediction(
-    input_file: Union[str, Path],
+    input_file: Union[str, Path, List[Union[str, Path]]],
     output_file: Optional[Union[str, Path]] = None,
     config: Optional[Dict[str, Any]] = None,
+    netmhcpan_script: Optional[Union[str, Path]] = None,
     **kwargs
 ) -> Dict[str, Any]:
     """
     Predict MHC Class I binding epitopes from protein FASTA sequences using NetMHCpan-4.2.
 
     Scans protein sequences for potential binding peptides of specified lengths.
+    Several input files are merged into one FASTA file and predicted in a
+    single NetMHCpan run; results['input_records'] then maps each source file
+    to the FASTA record IDs it contributed.
 
     Args:
-        input_file: Path to input FASTA file
+        input_file: Path to input FASTA file, or a list of paths
         output_file: Path to save output (optional, auto-generated if not provided)
         config: Configuration dict (uses DEFAULT_CONFIG if not provided)
+        netmhcpan_script: NetMHCpan executable from an earlier
+            setup_netmhcpan_env() call (set up here if not provided)
         **kwargs: Override specific config parameters
 
     Returns:
@@ -73,41 +127,78 @@ def run_protein_prediction(
         >>> print(f"Total peptides: {result['results']['total_lines']}")
     """
     # Setup
-    input_file = Path(input_file)
-    config = {**DEFAULT_CONFIG, **(config or {}), **kwargs}
+    if isinstance(input_file, (list, tuple)):
+        input_files = [Path(path) for path in input_file]
+    else:
+        input_files = [Path(input_file)]
+    input_file = input_files[0]
+    input_label = ",".join(map(str, input_files))
+    # Layered lookup (kwargs, then config, then defaults) without merging copies
+    config = ChainMap(kwargs, config or {}, DEFAULT_CONFIG)
 
     # Setup logger
     logger = setup_logger("protein_prediction", config.get("log_level", "INFO"))
 
-    # Validate input
-    if not validate_input_file(input_file):
-        error_msg = f"Input file not found or not readable: {input_file}"
-        logger.error(error_msg)
-        raise FileNotFoundError(error_msg)
+    # Validate input (one stat per file; the sizes are reused for logging)
+    try:
+        input_size = sum(stat_input_file(path).st_size for path in input_files)
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        raise
 
     # Auto-generate output file if not provided
     if output_file is None:
         length_suffix = config["peptide_length"].replace(",", "_")
-        output_file = input_file.parent / f"{input_file.stem}_protein_pred_{length_suffix}mer.txt"
+        stem = input_file.stem if len(input_files) == 1 else f"{input_file.stem}_batch{len(input_files)}"
+        output_file = input_file.parent / f"{stem}_protein_pred_{length_suffix}mer.txt"
     else:
         output_file = Path(output_file)
 
-    logger.info(f"Starting protein prediction for: {input_file}")
+    logger.info(f"Starting protein prediction for: {input_label} ({input_size} bytes)")
     logger.info(f"Allele: {config['allele']}")
     logger.info(f"Peptide lengths: {config['peptide_length']}")
     logger.info(f"Output: {output_file}")
 
+    merged_file = None
+    provenance = None
     try:
-        # Setup NetMHCpan environment
-        netmhcpan_script = setup_netmhcpan_env()
+        # Setup NetMHCpan environment (unless the caller already did)
+        if netmhcpan_script is None:
+            netmhcpan_script = setup_netmhcpan_env()
+
+        # Peptide lists skip NetMHCpan's FASTA k-mer scan entirely
+        input_type = config.get("input_type", "auto")
+        if input_type == "auto":
+            input_types = {detect_input_type(path) for path in input_files}
+            if len(input_types) > 1:
+                raise ValueError("Cannot merge FASTA and peptide list inputs into one run")
+            input_type = input_types.pop()
+        logger.info(f"Input type: {input_type}")
+
+        # Several inputs: one merged file, so NetMHCpan starts (and loads
+        # its model) once instead of once per file
+        if len(input_files) > 1:
+            fd, merged_name = tempfile.mkstemp(prefix="netmhcpan_merged_", suffix=".fsa")
+            os.close(fd)
+            merged_file = Path(merged_name)
+            provenance = merge_input_files(input_files, merged_file)
+            logger.info(f"Merged {len(input_files)} input files into {merged_file}")
+            input_file = merged_file
 
         # Build command
-        cmd = [
-            str(netmhcpan_script),
-            "-f", str(input_file),  # FASTA input
-            "-a", config["allele"],  # Specify allele
-            "-l", config["peptide_length"]  # Peptide lengths
-        ]
+        if input_type == "peptide":
+            cmd = [
+                str(netmhcpan_script),
+                "-p", os.fspath(input_file),  # Peptide list input (lengths are implicit)
+                "-a", config["allele"]  # Specify allele
+            ]
+        else:
+            cmd = [
+                str(netmhcpan_script),
+                "-f", os.fspath(input_file),  # FASTA input
+                "-a", config["allele"],  # Specify allele
+                "-l", config["peptide_length"]  # Peptide lengths
+            ]
 
         # Add optional parameters
         if config.get("rank_threshold") is not None:
@@ -116,17 +207,24 @@ def run_protein_prediction(
         if config.get("sort_output"):
             cmd.append("-s")  # Sort by descending affinity
 
-        # Run prediction
-        success = run_netmhcpan_command(cmd, output_file, logger)
+        # Run prediction, parsing stdout as it streams from NetMHCpan while
+        # it is saved to the output file (no second read of the output)
+        success, results = run_netmhcpan_streaming(
+            cmd,
+            lambda lines: parse_netmhcpan_lines(lines, logger),
+            output_file,
+            logger
+        )
 
-        # Parse results
-        results = {}
         if success:
-            results = parse_netmhcpan_results(output_file, logger)
             # Add protein-specific metadata
             results["peptide_lengths"] = config["peptide_length"]
+            results["input_type"] = input_type
+            if provenance is not None:
+                results["input_records"] = provenance
             logger.info(f"Protein prediction completed successfully!")
         else:
+            results = {}
             logger.error("Protein prediction failed")
 
         return {
@@ -134,9 +232,9 @@ def run_protein_prediction(
             "output_file": str(output_file),
             "results": results,
             "metadata": {
-                "input_file": str(input_file),
-                "config": config,
-                "command": " ".join(cmd)
+                "input_file": input_label,
+                "config": dict(config),
+                "command": cmd
             }
         }
 
@@ -147,16 +245,20 @@ def run_protein_prediction(
             "output_file": str(output_file) if output_file else None,
             "results": {},
             "metadata": {
-                "input_file": str(input_file),
-                "config": config,
+                "input_file": input_label,
+                "config": dict(config),
                 "error": str(e)
             }
         }
+    finally:
+        if merged_file is not None:
+            merged_file.unlink(missing_ok=True)
 
 # ==============================================================================
 # CLI Interface
 # ==============================================================================
-def main():
+@lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description=__doc__,
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -168,6 +270,9 @@ Examples:
   # Multiple peptide lengths
   python scripts/protein_prediction.py --input protein.fsa --length 8,9,10
 
+  # Several FASTA files in a single NetMHCpan run
+  python scripts/protein_prediction.py --input protein1.fsa,protein2.fsa
+
   # Different allele with sorted output
   python scripts/protein_prediction.py --input protein.fsa --allele HLA-B07:02 --sort
 
@@ -180,9 +285,10 @@ Examples:
     )
 
     parser.add_argument(
-        '--input', '-i',
+        '--input', '--input-files', '-i',
+        dest='input',
         required=True,
-        help='Input FASTA file path'
+        help='Input FASTA file path (comma-separated paths are merged into one run)'
     )
     parser.add_argument(
         '--output', '-o',
@@ -194,7 +300,8 @@ Examples:
         help=f'HLA allele for prediction (default: {DEFAULT_CONFIG["allele"]})'
     )
     parser.add_argument(
-        '--length', '-l',
+        '--length', '--peptide-lengths', '-l',
+        dest='length',
         default=DEFAULT_CONFIG["peptide_length"],
         help=f'Peptide lengths (comma-separated, e.g., "8,9,10") (default: {DEFAULT_CONFIG["peptide_length"]})'
     )
@@ -208,6 +315,12 @@ Examples:
         action='store_true',
         help='Sort output by descending affinity'
     )
+    parser.add_argument(
+        '--input-type',
+        choices=['auto', 'fasta', 'peptide'],
+        default=DEFAULT_CONFIG["input_type"],
+        help='Input format; auto detects plain peptide lists and runs them with -p (default: auto)'
+    )
     parser.add_argument(
         '--config', '-c',
         help='Config file (JSON)'
@@ -219,13 +332,14 @@ Examples:
         help='Logging level'
     )
 
-    args = parser.parse_args()
+    return parser
+
+
+def main():
+    args = _build_parser().parse_args()
 
     # Load config if provided
-    config = None
-    if args.config:
-        with open(args.config) as f:
-            config = json.load(f)
+    config = load_config(args.config) if args.config else None
 
     # Override config with command line arguments
     cli_overrides = {}
@@ -237,13 +351,16 @@ Examples:
         cli_overrides["rank_threshold"] = args.rank_threshold
     if args.sort:
         cli_overrides["sort_output"] = True
+    if args.input_type != DEFAULT_CONFIG["input_type"]:
+        cli_overrides["input_type"] = args.input_type
     if args.log_level != DEFAULT_CONFIG["log_level"]:
         cli_overrides["log_level"] = args.log_level
 
     # Run prediction
     try:
+        input_files = [path for path in args.input.split(',') if path]
         result = run_protein_prediction(
-            input_file=args.input,
+            input_file=input_files if len(input_files) > 1 else args.input,
             output_file=args.output,
             config=config,
             **cli_overrides
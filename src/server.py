@@ -7,33 +7,110 @@ Fast operations return results immediately, while batch processing uses the subm
 from fastmcp import FastMCP
 from pathlib import Path
 from typing import Optional, List, Union
+from functools import cache
+import asyncio
+import re
 import sys
 import os
+import uuid
 
 # Setup paths
 SCRIPT_DIR = Path(__file__).parent.resolve()
 MCP_ROOT = SCRIPT_DIR.parent
 SCRIPTS_DIR = MCP_ROOT / "scripts"
-sys.path.insert(0, str(SCRIPT_DIR))
-sys.path.insert(0, str(SCRIPTS_DIR))
+PROTEIN_PREDICTION_SCRIPT = str(SCRIPTS_DIR / "protein_prediction.py")
+BINDING_AFFINITY_SCRIPT = str(SCRIPTS_DIR / "binding_affinity_prediction.py")
+# NetMHCpan outputs keyed by input contents + options, shared by repeated calls
+# (unbounded: entries are never evicted, delete the directory to reclaim space)
+PEPTIDE_CACHE_DIR = str(MCP_ROOT / ".peptide_cache")
+# src/ (for jobs) and the MCP root (for the scripts package) go to the front
+# of the search path: "scripts" is a generic top-level name, and any other
+# package of that name on sys.path (e.g. in site-packages) must not shadow it
+for _path in (str(SCRIPT_DIR), str(MCP_ROOT)):
+    if _path in sys.path:
+        sys.path.remove(_path)
+    sys.path.insert(0, _path)
 
 from jobs.manager import job_manager
 from loguru import logger
 
-# Import script functions
+# Locate NetMHCpan and set its environment once for the server process; the
+# tools pass this path on so no call repeats the setup. If the install is
+# missing, the scripts set up (and report the error) per call instead.
 try:
-    from peptide_prediction import run_peptide_prediction
-    from protein_prediction import run_protein_prediction
-    from binding_affinity_prediction import run_binding_affinity_prediction
-    from custom_mhc_prediction import run_custom_mhc_prediction
-    from excel_export import run_excel_export
-except ImportError as e:
-    logger.warning(f"Could not import script modules: {e}")
-    # We'll handle this gracefully in the tools
+    from scripts.lib.utils import setup_netmhcpan_env
+    NETMHCPAN_SCRIPT = setup_netmhcpan_env(MCP_ROOT)
+except (ImportError, FileNotFoundError) as e:
+    logger.warning(f"NetMHCpan setup deferred to tool calls: {e}")
+    NETMHCPAN_SCRIPT = None
 
 # Create MCP server
 mcp = FastMCP("NetMHCpan-4.2")
 
+# Script functions are imported on first use, so server start-up does not pay
+# for every script's imports and each tool only loads the script it runs.
+# A failed import is not cached and is retried (and reported) on the next call.
+@cache
+def _get_peptide_fn():
+    from scripts.peptide_prediction import run_peptide_prediction
+    return run_peptide_prediction
+
+@cache
+def _get_protein_fn():
+    from scripts.protein_prediction import run_protein_prediction
+    return run_protein_prediction
+
+@cache
+def _get_multi_allele_fn():
+    from scripts.binding_affinity_prediction import run_multi_allele_prediction
+    return run_multi_allele_prediction
+
+@cache
+def _get_custom_mhc_fn():
+    from scripts.custom_mhc_prediction import run_custom_mhc_prediction
+    return run_custom_mhc_prediction
+
+@cache
+def _get_excel_export_fn():
+    from scripts.excel_export import run_excel_export
+    return run_excel_export
+
+
+def _run_multi_allele_single_call(
+    input_file: str,
+    alleles: Union[str, List[str]],
+    prediction_mode: str = "both",
+    output_file: Optional[str] = None
+) -> dict:
+    """
+    Predict all alleles with one NetMHCpan invocation (-a A,B,C).
+
+    NetMHCpan loads its model once for the whole allele list; the output is
+    split back per allele by the MHC column (results['per_allele']).
+    """
+    return _get_multi_allele_fn()(
+        input_file=input_file,
+        alleles=alleles,
+        output_file=output_file,
+        prediction_mode=prediction_mode,
+        netmhcpan_script=NETMHCPAN_SCRIPT
+    )
+
+def _call_output_file(input_file: str, label: str, output_file: Optional[str] = None) -> str:
+    """
+    Output path for one tool call: the caller's, else a name unique to the call.
+
+    The scripts' own default names depend only on the input file, so tool
+    calls running concurrently on one input would overwrite (and parse)
+    each other's output. The generated name carries the label (e.g. the
+    allele) and a random suffix, next to the input file like the defaults.
+    """
+    if output_file:
+        return output_file
+    input_path = Path(input_file)
+    label = re.sub(r"[^A-Za-z0-9_.-]", "", label)
+    return str(input_path.parent / f"{input_path.stem}_{label}_{uuid.uuid4().hex[:8]}.txt")
+
 # ==============================================================================
 # Job Management Tools (for async operations)
 # ==============================================================================
@@ -107,9 +184,12 @@ def list_jobs(status: Optional[str] = None) -> dict:
 # ==============================================================================
 # NetMHCpan Prediction Tools (Synchronous - Fast Operations)
 # ==============================================================================
+# The tools are coroutines: each NetMHCpan run is handed to a worker thread
+# with asyncio.to_thread, so concurrent tool calls run their subprocesses in
+# parallel instead of blocking the server's event loop one at a time.
 
 @mcp.tool()
-def predict_peptide_binding(
+async def predict_peptide_binding(
     input_file: str,
     allele: str = "HLA-A02:01",
     rank_threshold: Optional[float] = None,
@@ -130,14 +210,17 @@ def predict_peptide_binding(
         Dictionary with binding predictions, strong/weak binder counts, and output path
     """
     try:
-        from peptide_prediction import run_peptide_prediction
-        result = run_peptide_prediction(
+        result = await asyncio.to_thread(
+            _get_peptide_fn(),
             input_file=input_file,
             allele=allele,
             rank_threshold=rank_threshold,
-            output_file=output_file
+            output_file=_call_output_file(input_file, f"{allele}_predictions", output_file),
+            cache_dir=PEPTIDE_CACHE_DIR,
+            netmhcpan_script=NETMHCPAN_SCRIPT
         )
-        return {"status": "success", **result}
+        result["status"] = "success"
+        return result
     except FileNotFoundError as e:
         return {"status": "error", "error": f"Input file not found: {e}"}
     except Exception as e:
@@ -145,7 +228,7 @@ def predict_peptide_binding(
         return {"status": "error", "error": str(e)}
 
 @mcp.tool()
-def predict_protein_epitopes(
+async def predict_protein_epitopes(
     input_file: str,
     peptide_lengths: str = "9",
     allele: str = "HLA-A02:01",
@@ -158,7 +241,8 @@ def predict_protein_epitopes(
     Fast operation (~1 second) for epitope scanning from FASTA sequences.
 
     Args:
-        input_file: Path to FASTA file with protein sequence(s)
+        input_file: Path to FASTA file with protein sequence(s); a plain
+            peptide list is detected and run in peptide (-p) mode
         peptide_lengths: Comma-separated lengths to scan (e.g., "8,9,10")
         allele: HLA allele (default: HLA-A02:01)
         sort_output: Sort results by binding affinity
@@ -168,15 +252,19 @@ def predict_protein_epitopes(
         Dictionary with epitope scan results and peptide statistics
     """
     try:
-        from protein_prediction import run_protein_prediction
-        result = run_protein_prediction(
+        result = await asyncio.to_thread(
+            _get_protein_fn(),
             input_file=input_file,
             peptide_lengths=peptide_lengths,
             allele=allele,
             sort_output=sort_output,
-            output_file=output_file
+            output_file=_call_output_file(
+                input_file, f"{allele}_protein_pred_{peptide_lengths.replace(',', '_')}mer", output_file
+            ),
+            netmhcpan_script=NETMHCPAN_SCRIPT
         )
-        return {"status": "success", **result}
+        result["status"] = "success"
+        return result
     except FileNotFoundError as e:
         return {"status": "error", "error": f"Input file not found: {e}"}
     except Exception as e:
@@ -184,9 +272,9 @@ def predict_protein_epitopes(
         return {"status": "error", "error": str(e)}
 
 @mcp.tool()
-def predict_binding_affinity(
+async def predict_binding_affinity(
     input_file: str,
-    allele: str = "HLA-A02:01",
+    allele: Union[str, List[str]] = "HLA-A02:01",
     prediction_mode: str = "both",
     output_file: Optional[str] = None
 ) -> dict:
@@ -197,22 +285,25 @@ def predict_binding_affinity(
 
     Args:
         input_file: Path to file with peptides
-        allele: HLA allele (default: HLA-A02:01)
+        allele: HLA allele, or several (list or comma-separated) predicted in
+            a single NetMHCpan run (default: HLA-A02:01)
         prediction_mode: Prediction type - "EL" (elution), "BA" (binding), or "both"
         output_file: Optional path to save detailed output
 
     Returns:
         Dictionary with IC50 scores, EL predictions, and binding classifications
+        (split per allele under results['per_allele'])
     """
     try:
-        from binding_affinity_prediction import run_binding_affinity_prediction
-        result = run_binding_affinity_prediction(
+        result = await asyncio.to_thread(
+            _run_multi_allele_single_call,
             input_file=input_file,
-            allele=allele,
+            alleles=allele,
             prediction_mode=prediction_mode,
             output_file=output_file
         )
-        return {"status": "success", **result}
+        result["status"] = "success"
+        return result
     except FileNotFoundError as e:
         return {"status": "error", "error": f"Input file not found: {e}"}
     except ValueError as e:
@@ -222,7 +313,7 @@ def predict_binding_affinity(
         return {"status": "error", "error": str(e)}
 
 @mcp.tool()
-def predict_custom_mhc_binding(
+async def predict_custom_mhc_binding(
     input_file: str,
     mhc_sequence_file: str,
     mhc_name: str = "CUSTOM_MHC",
@@ -243,14 +334,16 @@ def predict_custom_mhc_binding(
         Dictionary with custom MHC predictions and metadata
     """
     try:
-        from custom_mhc_prediction import run_custom_mhc_prediction
-        result = run_custom_mhc_prediction(
+        result = await asyncio.to_thread(
+            _get_custom_mhc_fn(),
             input_file=input_file,
             mhc_sequence_file=mhc_sequence_file,
             mhc_name=mhc_name,
-            output_file=output_file
+            output_file=_call_output_file(input_file, f"{mhc_name}_custom_mhc_pred", output_file),
+            netmhcpan_script=NETMHCPAN_SCRIPT
         )
-        return {"status": "success", **result}
+        result["status"] = "success"
+        return result
     except FileNotFoundError as e:
         return {"status": "error", "error": f"File not found: {e}"}
     except Exception as e:
@@ -258,7 +351,7 @@ def predict_custom_mhc_binding(
         return {"status": "error", "error": str(e)}
 
 @mcp.tool()
-def export_predictions_to_excel(
+async def export_predictions_to_excel(
     input_file: str,
     alleles: Union[str, List[str]],
     excel_file: Optional[str] = None
@@ -277,20 +370,22 @@ def export_predictions_to_excel(
         Dictionary with Excel export results and comparison statistics
     """
     try:
-        from excel_export import run_excel_export
-
         # Handle both string and list inputs for alleles
         if isinstance(alleles, str):
             alleles_list = [alleles]
         else:
             alleles_list = alleles
 
-        result = run_excel_export(
+        result = await asyncio.to_thread(
+            _get_excel_export_fn(),
             input_file=input_file,
             alleles=alleles_list,
-            excel_file=excel_file
+            excel_file=excel_file,
+            output_file=_call_output_file(input_file, "multi"),
+            netmhcpan_script=NETMHCPAN_SCRIPT
         )
-        return {"status": "success", **result}
+        result["status"] = "success"
+        return result
     except FileNotFoundError as e:
         return {"status": "error", "error": f"Input file not found: {e}"}
     except Exception as e:
@@ -311,7 +406,8 @@ def submit_batch_protein_analysis(
     """
     Submit batch protein epitope analysis for multiple FASTA files.
 
-    Process multiple protein sequences in a single job. Use for:
+    Process multiple protein sequences in a single job; the files are merged
+    into one FASTA so NetMHCpan runs (and loads its model) only once. Use for:
     - Analyzing multiple proteins from a proteome
     - Batch screening of protein variants
     - Large-scale epitope discovery
@@ -325,12 +421,11 @@ def submit_batch_protein_analysis(
     Returns:
         Dictionary with job_id. Use get_job_status() to monitor progress.
     """
-    script_path = str(SCRIPTS_DIR / "protein_prediction.py")
-
     return job_manager.submit_job(
-        script_path=script_path,
+        script_path=PROTEIN_PREDICTION_SCRIPT,
         args={
-            "input_files": input_files,  # Will be converted to comma-separated string
+            # Merged by the script into one FASTA and predicted in one NetMHCpan run
+            "input_files": ",".join(input_files),
             "peptide_lengths": peptide_lengths,
             "allele": allele
         },
@@ -347,7 +442,8 @@ def submit_multi_allele_screening(
     """
     Submit multi-allele screening for comprehensive HLA coverage.
 
-    Screen the same peptides against multiple HLA alleles. Use for:
+    Screen the same peptides against multiple HLA alleles in a single
+    NetMHCpan run (results are split per allele). Use for:
     - Population coverage analysis
     - Vaccine design across HLA diversity
     - Comprehensive binding profile analysis
@@ -361,10 +457,8 @@ def submit_multi_allele_screening(
     Returns:
         Dictionary with job_id for monitoring the multi-allele analysis.
     """
-    script_path = str(SCRIPTS_DIR / "binding_affinity_prediction.py")
-
     return job_manager.submit_job(
-        script_path=script_path,
+        script_path=BINDING_AFFINITY_SCRIPT,
         args={
             "input": input_file,
             "alleles": ",".join(alleles),  # Multiple alleles
@@ -399,10 +493,8 @@ def submit_large_peptide_screening(
     Returns:
         Dictionary with job_id for monitoring the large-scale screening.
     """
-    script_path = str(SCRIPTS_DIR / "binding_affinity_prediction.py")
-
     return job_manager.submit_job(
-        script_path=script_path,
+        script_path=BINDING_AFFINITY_SCRIPT,
         args={
             "input": input_file,
             "allele": allele,
@@ -419,7 +511,8 @@ def submit_large_peptide_screening(
 @mcp.tool()
 def analyze_netmhcpan_output(
     netmhcpan_output_file: str,
-    rank_threshold: float = 2.0
+    rank_threshold: float = 2.0,
+    include_predictions: bool = True
 ) -> dict:
     """
     Analyze raw NetMHCpan output file and extract binding statistics.
@@ -432,18 +525,28 @@ def analyze_netmhcpan_output(
     Args:
         netmhcpan_output_file: Path to NetMHCpan output file
         rank_threshold: Rank threshold for weak binder classification (default: 2.0)
+        include_predictions: Return the parsed predictions (default: True).
+            Set to False to get the counts only; re-analyzing an unchanged
+            file with another threshold then re-classifies cached %Rank
+            values instead of re-reading the file
 
     Returns:
         Dictionary with binding statistics and parsed predictions
     """
     try:
-        from lib.utils import parse_netmhcpan_results, setup_logger
+        from scripts.lib.utils import parse_netmhcpan_results, setup_logger
 
         logger = setup_logger("netmhcpan_analyzer")
-        result = parse_netmhcpan_results(netmhcpan_output_file, logger)
+        result = parse_netmhcpan_results(
+            netmhcpan_output_file, logger,
+            collect_predictions=include_predictions,
+            rank_threshold=rank_threshold
+        )
 
         if result:
-            return {"status": "success", **result}
+            result["status"] = "success"
+            result["rank_threshold"] = rank_threshold
+            return result
         else:
             return {"status": "error", "error": "Failed to parse NetMHCpan output"}
 
@@ -462,7 +565,7 @@ def get_server_info() -> dict:
         Dictionary with server version, supported alleles, and example usage
     """
     try:
-        from lib.utils import setup_netmhcpan_env
+        from scripts.lib.utils import setup_netmhcpan_env
 
         netmhcpan_path = setup_netmhcpan_env(MCP_ROOT)
 
@@ -513,5 +616,14 @@ if __name__ == "__main__":
     logger.info(f"Scripts directory: {SCRIPTS_DIR}")
     logger.info(f"MCP root: {MCP_ROOT}")
 
+    # Use uvloop's libuv event loop for socket and subprocess I/O when it
+    # is installed (optional; the default asyncio loop is used otherwise)
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
+    except ImportError:
+        pass
+
     # Run the server
     mcp.run()
\ No newline at end of file